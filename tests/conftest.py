@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
 PROJECT_DIR_NAME = 'yatube'
@@ -37,3 +39,19 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True, scope='session')
+def temporary_cache():
+    from core.testing import temporary_cache
+
+    with temporary_cache():
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Транзакция теста откатывается, и поколение после коммита не меняется.
+    from django.core.cache import cache
+
+    cache.clear()
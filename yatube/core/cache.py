@@ -0,0 +1,232 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+    'expires REAL, accessed REAL NOT NULL) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+)
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 64 * 1024 * 1024,
+}
+# Время доступа для LRU обновляется не чаще раза в секунду на ключ,
+# иначе каждое чтение превращалось бы в запись.
+ACCESS_RESOLUTION = 1.0
+# Проверка переполнения — раз в столько записей этого процесса.
+CULL_EVERY = 100
+
+
+def _dump(value):
+    # Целые, влезающие в INTEGER, хранятся как есть, без pickle.
+    if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _load(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    """
+    Кеш в файле SQLite (LOCATION), общий для всех процессов на машине.
+    WAL даёт читать параллельно с записью. Устаревшие записи удаляются
+    по TTL, а при превышении MAX_ENTRIES вытесняется 1/CULL_FREQUENCY
+    давно не читавшихся (LRU). incr атомарен между процессами.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != pid:
+            directory = os.path.dirname(self.location)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self.location, isolation_level=None, check_same_thread=False)
+            for name, value in PRAGMAS.items():
+                conn.execute(f'PRAGMA {name} = {value}')
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._local.conn, self._local.pid = conn, pid
+        return conn
+
+    @contextmanager
+    def _write(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _touch_accessed(self, keys, now):
+        with self._write() as conn:
+            conn.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                [(now, key) for key in keys],
+            )
+
+    def _fetch(self, keys):
+        conn = self._connection()
+        now = time.time()
+        found, stale = {}, []
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ', '.join('?' * len(chunk))
+            rows = conn.execute(
+                f'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({marks})', chunk,
+            )
+            for key, value, expires, accessed in rows:
+                if expires is not None and expires <= now:
+                    continue
+                found[key] = _load(value)
+                if now - accessed >= ACCESS_RESOLUTION:
+                    stale.append(key)
+        if stale:
+            self._touch_accessed(stale, now)
+        return found
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        mapped = {self._key(key, version): key for key in keys}
+        found = self._fetch(list(mapped))
+        return {mapped[key]: value for key, value in found.items()}
+
+    def _store(self, conn, rows):
+        conn.executemany(
+            'INSERT OR REPLACE INTO cache (key, value, expires, accessed) '
+            'VALUES (?, ?, ?, ?)',
+            rows,
+        )
+        self._writes += len(rows)
+        if self._writes >= CULL_EVERY:
+            self._writes = 0
+            self._cull(conn)
+
+    def _cull(self, conn):
+        conn.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            [time.time()],
+        )
+        count = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            conn.execute('DELETE FROM cache')
+            return
+        conn.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            [max(count // self._cull_frequency, count - self._max_entries)],
+        )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as conn:
+            self._store(conn, [
+                (key, _dump(value), self._expires(timeout), time.time()),
+            ])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires, now = self._expires(timeout), time.time()
+        rows = [
+            (self._key(key, version), _dump(value), expires, now)
+            for key, value in data.items()
+        ]
+        with self._write() as conn:
+            self._store(conn, rows)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as conn:
+            row = conn.execute(
+                'SELECT expires FROM cache WHERE key = ?', [key]).fetchone()
+            if row is not None and (row[0] is None or row[0] > now):
+                return False
+            self._store(conn, [
+                (key, _dump(value), self._expires(timeout), now),
+            ])
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as conn:
+            row = conn.execute(
+                'SELECT value, expires FROM cache WHERE key = ?',
+                [key]).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                raise ValueError(f"Key '{key}' not found")
+            value = _load(row[0]) + delta
+            conn.execute(
+                'UPDATE cache SET value = ?, accessed = ? WHERE key = ?',
+                [_dump(value), now, key],
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as conn:
+            changed = conn.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                [self._expires(timeout), key, time.time()],
+            ).rowcount
+        return bool(changed)
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return key in self._fetch([key])
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._write() as conn:
+            conn.execute('DELETE FROM cache WHERE key = ?', [key])
+
+    def delete_many(self, keys, version=None):
+        rows = [(self._key(key, version),) for key in keys]
+        with self._write() as conn:
+            conn.executemany('DELETE FROM cache WHERE key = ?', rows)
+
+    def clear(self):
+        with self._write() as conn:
+            conn.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        """Соединения живут весь процесс: открывать их заново дорого."""
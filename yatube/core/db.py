@@ -0,0 +1,58 @@
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+_write_lock = threading.Lock()
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """
+    Настраивает каждое новое соединение SQLite по SQLITE_PRAGMAS:
+    WAL, чтобы чтение не ждало записи, busy_timeout вместо мгновенного
+    «database is locked» и т. д. Подключается в CoreConfig.ready.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    # Напрямую через sqlite3, мимо обёрток Django: настройка соединения
+    # не должна попадать в учёт запросов страницы.
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def _is_locked(error):
+    return 'locked' in str(error)
+
+
+def serialized_write(func):
+    """
+    Запись в транзакции: только сама запись, без разбора запроса и
+    форм, чтобы блокировка держалась недолго. Для SQLite записи процесса
+    идут по одной, а «database is locked» от других процессов
+    повторяется до DB_WRITE_RETRIES раз с растущей паузой, поэтому func
+    должна выдерживать повтор после отката. Внутри чужой транзакции
+    повторять нечего, ошибка пробрасывается.
+
+        post = serialized_write(form.save)()
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        lock = _write_lock if connection.vendor == 'sqlite' else nullcontext()
+        attempt = 0
+        while True:
+            nested = connection.in_atomic_block
+            try:
+                with lock, transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if (
+                    nested or not _is_locked(error)
+                    or attempt >= settings.DB_WRITE_RETRIES
+                ):
+                    raise
+            time.sleep(settings.DB_WRITE_RETRY_DELAY * 2 ** attempt)
+            attempt += 1
+    return wrapper
@@ -0,0 +1,51 @@
+import re
+
+from django.core import signing
+from django.template.loader import render_to_string
+
+SALT = 'core.holes'
+MARKER = re.compile(r'<!--hole:([\w:.\-]+)-->')
+# Шаблон дыры -> функция, достраивающая её контекст по запросу.
+CONTEXTS = {}
+
+
+def context(template):
+    """Регистрирует функцию (request, **kwargs) -> dict для дыры."""
+    def decorator(function):
+        CONTEXTS[template] = function
+        return function
+    return decorator
+
+
+def punching(request):
+    return getattr(request, 'punch_holes', False)
+
+
+def marker(template, kwargs):
+    """
+    Метка дыры в общей оболочке. Подпись не даёт подставить свою метку
+    через пользовательский текст, попавший в кеш.
+    """
+    return f'<!--hole:{signing.dumps([template, kwargs], salt=SALT)}-->'
+
+
+def extra(request, template, kwargs):
+    builder = CONTEXTS.get(template)
+    return builder(request, **kwargs) if builder else {}
+
+
+def render(request, template, kwargs):
+    context = extra(request, template, kwargs)
+    context.update(kwargs)
+    return render_to_string(template, context, request=request)
+
+
+def fill(request, content):
+    """Подставляет в оболочку дыры, отрисованные для этого запроса."""
+    def replace(match):
+        try:
+            template, kwargs = signing.loads(match.group(1), salt=SALT)
+        except signing.BadSignature:
+            return ''
+        return render(request, template, kwargs)
+    return MARKER.sub(replace, content)
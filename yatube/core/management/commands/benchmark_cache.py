@@ -0,0 +1,138 @@
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'filebased': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'core.cache.SQLiteCache',
+}
+LOCATIONS = {
+    'locmem': 'benchmark',
+    'filebased': 'filebased',
+    'sqlite': 'cache.sqlite3',
+}
+COUNTER = 'benchmark:counter'
+
+
+def create(backend, directory):
+    location = LOCATIONS[backend]
+    if backend != 'locmem':
+        location = os.path.join(directory, location)
+    return import_string(BACKENDS[backend])(
+        location, {'OPTIONS': {'MAX_ENTRIES': 100000}})
+
+
+def _rate(count, started):
+    return round(count / (time.perf_counter() - started))
+
+
+def operations(cache, keys, batch=50):
+    """Операций в секунду для set, get, get_many, set_many и incr."""
+    names = [f'benchmark:{index}' for index in range(keys)]
+    value = {'text': 'x' * 200, 'id': 1}
+    result = {}
+    started = time.perf_counter()
+    for name in names:
+        cache.set(name, value)
+    result['set'] = _rate(keys, started)
+    started = time.perf_counter()
+    for name in names:
+        cache.get(name)
+    result['get'] = _rate(keys, started)
+    started = time.perf_counter()
+    for start in range(0, keys, batch):
+        cache.get_many(names[start:start + batch])
+    result['get_many'] = _rate(keys, started)
+    started = time.perf_counter()
+    for start in range(0, keys, batch):
+        cache.set_many({name: value for name in names[start:start + batch]})
+    result['set_many'] = _rate(keys, started)
+    cache.set(COUNTER, 0)
+    started = time.perf_counter()
+    for _ in range(keys):
+        cache.incr(COUNTER)
+    result['incr'] = _rate(keys, started)
+    return result
+
+
+def _worker(arguments):
+    backend, directory, keys, rounds, seed = arguments
+    cache = create(backend, directory)
+    generator = random.Random(seed)
+    names = [f'shared:{index}' for index in range(keys)]
+    hits = total = 0
+    for _ in range(rounds):
+        generator.shuffle(names)
+        for name in names:
+            total += 1
+            if cache.get(name) is None:
+                cache.set(name, name)
+            else:
+                hits += 1
+        cache.incr(COUNTER)
+    return hits, total
+
+
+def shared(backend, directory, processes, keys, rounds):
+    """
+    Процессы читают общий набор ключей и дописывают промахи. Общий кеш
+    даёт почти сплошные попадания; счётчик показывает, потерялись ли
+    инкременты из разных процессов.
+    """
+    cache = create(backend, directory)
+    cache.clear()
+    cache.set(COUNTER, 0)
+    context = multiprocessing.get_context('fork')
+    with context.Pool(processes) as pool:
+        results = pool.map(_worker, [
+            (backend, directory, keys, rounds, seed)
+            for seed in range(processes)
+        ])
+    hits = sum(hits for hits, _ in results)
+    total = sum(total for _, total in results)
+    return {
+        'hit_rate': round(hits / total, 3),
+        'counter': cache.get(COUNTER),
+        'expected_counter': processes * rounds,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает кеш SQLite с LocMemCache и FileBasedCache: скорость '
+        'операций в одном процессе и долю попаданий между процессами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', action='append', dest='backends',
+            choices=BACKENDS, default=[],
+            help='По умолчанию все.',
+        )
+        parser.add_argument('--keys', type=int, default=2000)
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('--output', help='Записать результаты в JSON.')
+
+    def handle(self, *args, backends, keys, processes, rounds, output,
+               **options):
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for backend in backends or BACKENDS:
+                cache = create(backend, directory)
+                results[backend] = operations(cache, keys)
+                results[backend].update(shared(
+                    backend, directory, processes, keys, rounds))
+                cache.clear()
+                self.stdout.write(f'{backend:10} {results[backend]}')
+        if output:
+            with open(output, 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f'Результаты записаны в {output}')
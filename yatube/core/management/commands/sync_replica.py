@@ -0,0 +1,52 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import routers
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в реплики через backup API: '
+        'читатели реплики видят либо старую, либо новую копию целиком. '
+        'Реплика читается, только если скопирована после последней записи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='aliases', default=[],
+            help='Реплика из DATABASE_REPLICAS; по умолчанию все.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Скопировать в этот файл вместо файла реплики.',
+        )
+        parser.add_argument(
+            '--pages', type=int, default=-1,
+            help='Страниц за шаг; -1 — всё за один шаг.',
+        )
+
+    def handle(self, *args, aliases, output, pages, **options):
+        source = connections['default']
+        if source.vendor != 'sqlite':
+            raise CommandError('sync_replica работает только с SQLite')
+        unknown = set(aliases) - set(settings.DATABASE_REPLICAS)
+        if unknown:
+            raise CommandError(f'Не реплики: {", ".join(sorted(unknown))}')
+        source.ensure_connection()
+        for alias in aliases or settings.DATABASE_REPLICAS:
+            path = output or connections[alias].settings_dict['NAME']
+            connections[alias].close()
+            target = sqlite3.connect(path)
+            started = time.time()
+            try:
+                source.connection.backup(target, pages=pages)
+            finally:
+                target.close()
+            self.stdout.write(f'{alias}: скопировано в {path}')
+            if output:
+                break
+            routers.mark_synced(alias, started)
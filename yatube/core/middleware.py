@@ -0,0 +1,170 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from . import profiling, routers
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'\(%s(?:, %s)+\)')
+NUMBER = re.compile(r'\b\d+\b')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_shape(sql):
+    """SQL без значений: одинаковые запросы с разными id совпадают."""
+    return NUMBER.sub('?', IN_LIST.sub('(%s, ...)', sql))
+
+
+class QueryRecorder:
+    """execute_wrapper, который запоминает каждый запрос и его время."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(duration for _, duration in self.queries)
+
+    def repeated(self, limit):
+        """Формы запросов, выполненные limit и более раз: признак N+1."""
+        shapes = Counter(query_shape(sql) for sql, _ in self.queries)
+        return [
+            (shape, times) for shape, times in shapes.most_common()
+            if times >= limit
+        ]
+
+
+@contextmanager
+def recording(recorder):
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield
+
+
+class QueryBudgetMiddleware:
+    """
+    Считает SQL-запросы каждого запроса и отдаёт их число и суммарное
+    время в заголовках X-DB-Queries и X-DB-Time (мс). Бюджет задаётся
+    по имени URL в QUERY_BUDGETS; при QUERY_BUDGET_ENFORCE превышение
+    бюджета — ошибка, иначе оно и повторяющиеся запросы пишутся в лог.
+    Потоковый ответ проверяется, когда его дочитали: заголовки к тому
+    времени уже отправлены и учитывают только запросы до потока.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with recording(recorder):
+            response = self.get_response(request)
+        response['X-DB-Queries'] = recorder.count
+        response['X-DB-Time'] = f'{recorder.duration * 1000:.3f}'
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return response
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, match.view_name, recorder)
+        else:
+            self.check(match.view_name, recorder)
+        return response
+
+    def stream(self, chunks, view_name, recorder):
+        chunks = iter(chunks)
+        while True:
+            with recording(recorder):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+        self.check(view_name, recorder)
+
+    def check(self, view_name, recorder):
+        budget = settings.QUERY_BUDGETS.get(
+            view_name, settings.QUERY_BUDGET_DEFAULT)
+        repeated = recorder.repeated(settings.QUERY_BUDGET_REPEATS)
+        for shape, times in repeated:
+            logger.warning('N+1 в %s: %d раз %s', view_name, times, shape)
+        if recorder.count <= budget:
+            return
+        message = (
+            f'{view_name}: {recorder.count} запросов при бюджете {budget}'
+        )
+        if settings.QUERY_BUDGET_ENFORCE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует отдельный запрос: с подписанным заголовком X-Profile
+    или с флагом ?profile для staff. Остальные запросы проходят без
+    профилировщика. Должен стоять после AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if profiling.requested(request):
+            return profiling.run(request, self.get_response)
+        return self.get_response(request)
+
+
+class ReplicaMiddleware:
+    """
+    GET списков из REPLICA_VIEWS читает с реплики, если она скопирована
+    после последней записи или отстаёт не больше REPLICA_MAX_LAG секунд
+    (core.routers.readable_replicas); иначе с основной базы.
+    Записавший что-либо
+    клиент получает cookie и REPLICA_PIN_SECONDS читает только основную
+    базу, чтобы видеть свои изменения.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset()
+        try:
+            response = self.get_response(request)
+            if routers.wrote():
+                response.set_cookie(
+                    settings.REPLICA_PIN_COOKIE, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                )
+        finally:
+            routers.reset()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            settings.DATABASE_REPLICA_READS
+            and request.method in ('GET', 'HEAD')
+            and request.resolver_match.view_name in settings.REPLICA_VIEWS
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+        ):
+            routers.use_replica(*routers.readable_replicas())
@@ -0,0 +1,183 @@
+import json
+from functools import partial
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации: знает только соседей, без номеров."""
+
+    is_cursor = True
+    _load = None
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    @classmethod
+    def lazy(cls, paginator, load):
+        """
+        Страница, которая выбирает записи при первом обращении: если
+        список уже взят из кеша шаблона, запроса не будет. load()
+        возвращает (записи, has_next, has_previous).
+        """
+        page = cls(None, paginator, False, False)
+        page._load = load
+        return page
+
+    @property
+    def object_list(self):
+        if self._load is not None:
+            load, self._load = self._load, None
+            self._object_list, self._has_next, self._has_previous = load()
+        return self._object_list
+
+    @object_list.setter
+    def object_list(self, value):
+        self._object_list = value
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        self.object_list
+        return self._has_next
+
+    def has_previous(self):
+        self.object_list
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1], NEXT)
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], PREVIOUS)
+
+
+class CursorPaginator(Paginator):
+    """
+    Keyset-пагинация по (created, id): каждая страница выбирается
+    условием «строго после последней записи», без COUNT(*) и OFFSET.
+    Номерные страницы родительского Paginator остаются доступными.
+    """
+
+    def __init__(self, object_list, per_page,
+                 ordering=('-created', '-pk'), **kwargs):
+        super().__init__(object_list.order_by(*ordering), per_page, **kwargs)
+        self.ordering = ordering
+        self.fields = [name.lstrip('-') for name in ordering]
+
+    @cached_property
+    def count(self):
+        """
+        Номерные страницы — запасной вариант: записи считаются не дальше
+        PAGINATOR_MAX_COUNT, чтобы COUNT(*) не читал всю таблицу.
+        """
+        limit = settings.PAGINATOR_MAX_COUNT
+        return self.object_list.order_by()[:limit].count()
+
+    def _field(self, name):
+        meta = self.object_list.model._meta
+        return meta.pk if name == 'pk' else meta.get_field(name)
+
+    def encode_cursor(self, obj, direction):
+        """Курсор по объекту или по строке values() с полями сортировки."""
+        values = []
+        for name in self.fields:
+            field = self._field(name)
+            source = obj
+            if isinstance(obj, dict):
+                source = SimpleNamespace(
+                    **{field.attname: obj[field.attname]})
+            values.append(field.value_to_string(source))
+        payload = json.dumps([direction, values], separators=(',', ':'))
+        return urlsafe_base64_encode(payload.encode())
+
+    def decode_cursor(self, cursor):
+        try:
+            direction, values = json.loads(
+                urlsafe_base64_decode(cursor).decode())
+            if direction not in (NEXT, PREVIOUS):
+                raise InvalidCursor(cursor)
+            if len(values) != len(self.fields):
+                raise InvalidCursor(cursor)
+            values = [
+                self._field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (TypeError, ValueError, UnicodeDecodeError) as error:
+            raise InvalidCursor(cursor) from error
+        return direction, values
+
+    def _after(self, values, reverse=False, fields=None):
+        fields = fields or self.fields
+        condition = Q()
+        for index, name in enumerate(fields):
+            descending = self.ordering[index].startswith('-') != reverse
+            lookup = f'{name}__lt' if descending else f'{name}__gt'
+            equal = {fields[i]: values[i] for i in range(index)}
+            condition |= Q(**equal, **{lookup: values[index]})
+        return condition
+
+    def _order_by(self, reverse=False, fields=None):
+        fields = fields or self.fields
+        return [
+            f'-{field}' if name.startswith('-') != reverse else field
+            for name, field in zip(self.ordering, fields)
+        ]
+
+    def cursor_page(self, cursor=None):
+        """
+        Страница после (или перед) курсором; без курсора — первая.
+        Курсор проверяется сразу, записи выбираются при обращении.
+        """
+        direction, values = NEXT, None
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+        return CursorPage.lazy(
+            self, partial(self._cursor_items, direction, values))
+
+    def _cursor_items(self, direction, values):
+        size = self.per_page
+        if values is None:
+            items = list(self.object_list[:size + 1])
+            return items[:size], len(items) > size, False
+        if direction == NEXT:
+            items = list(
+                self.object_list.filter(self._after(values))[:size + 1])
+            return items[:size], len(items) > size, True
+        items = list(
+            self.object_list
+            .filter(self._after(values, reverse=True))
+            .order_by(*self._order_by(reverse=True))[:size + 1]
+        )
+        has_previous = len(items) > size
+        items = items[:size]
+        items.reverse()
+        return items, True, has_previous
+
+    def get_cursor_page(self, cursor=None):
+        """Как get_page(): битый курсор отдаёт первую страницу."""
+        try:
+            return self.cursor_page(cursor)
+        except InvalidCursor:
+            return self.cursor_page()
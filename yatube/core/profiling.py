@@ -0,0 +1,90 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.utils.text import slugify
+
+SALT = 'core.profiling'
+NAME = re.compile(r'^[\w-]+\.prof$')
+
+
+def make_token():
+    """Значение заголовка X-Profile; действует PROFILING_MAX_AGE секунд."""
+    return signing.TimestampSigner(salt=SALT).sign('profile')
+
+
+def valid_token(token):
+    try:
+        value = signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=settings.PROFILING_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return value == 'profile'
+
+
+def requested(request):
+    """Профилировать ли запрос: подписанный заголовок или флаг для staff."""
+    token = request.META.get('HTTP_X_PROFILE')
+    if token:
+        return valid_token(token)
+    if settings.PROFILING_PARAM in request.GET:
+        return request.user.is_staff
+    return False
+
+
+def run(request, get_response):
+    """Выполняет запрос под cProfile и сохраняет статистику в .prof."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        response = get_response(request)
+    finally:
+        profiler.disable()
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    name = '{}-{}-{}.prof'.format(
+        time.strftime('%Y%m%d-%H%M%S'),
+        uuid.uuid4().hex[:6],
+        slugify(request.path)[:60] or 'root',
+    )
+    profiler.dump_stats(os.path.join(settings.PROFILING_DIR, name))
+    response['X-Profile'] = name
+    return response
+
+
+def captures():
+    """Сохранённые профили, новые первыми."""
+    if not os.path.isdir(settings.PROFILING_DIR):
+        return []
+    found = []
+    for entry in os.scandir(settings.PROFILING_DIR):
+        if NAME.match(entry.name):
+            stat = entry.stat()
+            found.append({
+                'name': entry.name,
+                'size': stat.st_size,
+                'modified': stat.st_mtime,
+            })
+    return sorted(found, key=lambda item: item['modified'], reverse=True)
+
+
+def path(name):
+    """Путь к профилю; имя проверяется, чтобы не выйти из каталога."""
+    if not NAME.match(name):
+        raise FileNotFoundError(name)
+    full = os.path.join(settings.PROFILING_DIR, name)
+    if not os.path.isfile(full):
+        raise FileNotFoundError(name)
+    return full
+
+
+def summary(name, limit=60, sort='cumulative'):
+    stream = io.StringIO()
+    stats = pstats.Stats(path(name), stream=stream)
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
@@ -0,0 +1,65 @@
+import re
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+EXPLAINED = ('SELECT', 'UPDATE', 'DELETE')
+SCAN = re.compile(
+    r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?'
+    r'(?P<index> USING (?:COVERING )?INDEX)?'
+)
+TEMP_SORT = 'USE TEMP B-TREE FOR'
+
+
+def _names(sql, table):
+    """Имя таблицы и все её алиасы в запросе (Django пишет "t" U0)."""
+    aliases = re.findall(rf'"{table}"\s+(?:AS\s+)?"?([A-Z]\d+)\b', sql)
+    return {table, *aliases}
+
+
+def _is_full_scan(match, names, top_rows):
+    if not match or not names & {match.group(1), match.group(2)}:
+        return False
+    return not (match.group('index') and top_rows)
+
+
+def full_scans(sql, table, using='default'):
+    """
+    Строки EXPLAIN QUERY PLAN, где таблица читается целиком: любой SCAN,
+    в том числе по покрывающему индексу. Исключение одно — первые строки
+    индекса в порядке ORDER BY: запрос без WHERE и без сортировки во
+    временном дереве, который обрывает LIMIT.
+    """
+    if not sql.lstrip().upper().startswith(EXPLAINED):
+        return []
+    names = _names(sql, table)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        details = [row[-1] for row in cursor.fetchall()]
+    top_rows = (
+        re.search(r'\bLIMIT\b', sql) is not None
+        and re.search(r'\bWHERE\b', sql) is None
+        and not any(TEMP_SORT in detail for detail in details)
+    )
+    return [
+        detail for detail in details
+        if _is_full_scan(SCAN.match(detail), names, top_rows)
+    ]
+
+
+@contextmanager
+def forbid_full_scans(table='posts_post', using='default'):
+    """
+    Проверяет план каждого запроса, выполненного внутри блока, и падает,
+    если хотя бы один из них читает таблицу целиком.
+    """
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    problems = []
+    for query in context.captured_queries:
+        for detail in full_scans(query['sql'], table, using):
+            problems.append(f'{detail}: {query["sql"]}')
+    if problems:
+        raise AssertionError(
+            f'Полный проход по {table}:\n' + '\n'.join(problems))
@@ -0,0 +1,194 @@
+import hashlib
+import multiprocessing
+import os
+import posixpath
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+SALT = 'core.resizer'
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+MIME_TYPES = {
+    'JPEG': 'image/jpeg', 'PNG': 'image/png', 'GIF': 'image/gif',
+    'WEBP': 'image/webp',
+}
+FORMATS = {
+    '.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG', '.gif': 'GIF',
+    '.webp': 'WEBP',
+}
+
+_pool = None
+_pending = {}
+_changed = threading.Condition()
+
+
+class Busy(Exception):
+    """В пуле ресайза нет места, запрос стоит повторить позже."""
+
+
+def parse_geometry(geometry):
+    """Геометрия как у sorl: '300' — ширина, 'x800' — высота, '300x200'."""
+    width, _, height = str(geometry).partition('x')
+    width, height = int(width or 0) or None, int(height or 0) or None
+    if not (width or height):
+        raise ValueError(f'Неверная геометрия: {geometry}')
+    return width, height
+
+
+def token(name, geometry, crop=False, image_format=None):
+    width, height = parse_geometry(geometry)
+    return signing.dumps(
+        [name, width, height, bool(crop), image_format],
+        salt=SALT, compress=True)
+
+
+def url(name, geometry, crop=False, image_format=None):
+    """Адрес картинки нужного размера; сам файл при этом не читается."""
+    return reverse('image', args=[token(name, geometry, crop, image_format)])
+
+
+def variant_widths(intrinsic_width=None):
+    """
+    Ширины IMAGE_VARIANT_WIDTHS, которые меньше исходной: увеличенные
+    копии не добавляют деталей. Если часть ширин отброшена, наибольшей
+    становится исходная.
+    """
+    widths = list(settings.IMAGE_VARIANT_WIDTHS)
+    if intrinsic_width and widths[-1] >= intrinsic_width:
+        widths = [width for width in widths if width < intrinsic_width]
+        widths.append(intrinsic_width)
+    return widths
+
+
+def variants(intrinsic_width=None):
+    """(ширина, формат) всех вариантов: None — исходный формат."""
+    return [
+        (width, image_format)
+        for image_format in settings.IMAGE_VARIANT_FORMATS
+        for width in variant_widths(intrinsic_width)
+    ]
+
+
+def target_format(name, image_format):
+    if image_format:
+        return image_format.upper()
+    return FORMATS.get(posixpath.splitext(name)[1].lower(), 'JPEG')
+
+
+def cache_path(value):
+    """Файл дискового кеша для подписанных параметров."""
+    name, _, _, _, image_format = signing.loads(value, salt=SALT)
+    digest = hashlib.sha256(value.encode()).hexdigest()
+    extension = EXTENSIONS[target_format(name, image_format)]
+    return os.path.join(
+        settings.MEDIA_ROOT, settings.IMAGE_CACHE_DIR,
+        digest[:2], digest[2:4], f'{digest}.{extension}',
+    )
+
+
+def _size(original, width, height):
+    """Размер в пределах width/height; картинка не увеличивается."""
+    source_width, source_height = original
+    if width and height:
+        scale = min(width / source_width, height / source_height)
+    elif width:
+        scale = width / source_width
+    else:
+        scale = height / source_height
+    scale = min(scale, 1)
+    return (
+        max(1, round(source_width * scale)),
+        max(1, round(source_height * scale)),
+    )
+
+
+def resize(source, target, width, height, crop, image_format, quality,
+           max_pixels):
+    """
+    Работает в процессе пула: читает source, пишет target атомарно
+    через временный файл.
+    """
+    with Image.open(source) as image:
+        if image.width * image.height > max_pixels:
+            raise ValueError(f'Слишком много пикселей: {source}')
+        size = _size(image.size, width, height)
+        if crop and width and height:
+            # Рамка кадрирования уменьшается до размеров исходника.
+            scale = min(1, image.width / width, image.height / height)
+            size = (max(1, round(width * scale)),
+                    max(1, round(height * scale)))
+        if image.format == 'JPEG':
+            # Квадрат со стороной побольше: EXIF может повернуть картинку.
+            image.draft('RGB', (max(size), max(size)))
+        image = ImageOps.exif_transpose(image)
+        if crop and width and height:
+            image = ImageOps.fit(image, size, Image.LANCZOS)
+        else:
+            image = image.resize(_size(image.size, width, height),
+                                 Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temporary = f'{target}.{os.getpid()}.tmp'
+    image.save(temporary, image_format, quality=quality)
+    os.replace(temporary, target)
+
+
+def pool():
+    global _pool
+    if _pool is None:
+        # spawn: воркеры не наследуют потоки и соединения процесса Django.
+        _pool = ProcessPoolExecutor(
+            settings.IMAGE_RESIZE_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _pool
+
+
+def _finished(path):
+    def callback(future):
+        with _changed:
+            _pending.pop(path, None)
+            _changed.notify_all()
+    return callback
+
+
+def ensure(value, block=False):
+    """
+    Путь к готовому файлу в кеше. Промах отдаётся пулу процессов;
+    одинаковые параллельные запросы ждут одну задачу. В очереди не
+    больше IMAGE_RESIZE_QUEUE задач: сверх этого Busy, а с block=True —
+    ожидание места.
+    """
+    path = cache_path(value)
+    if os.path.exists(path):
+        return path
+    name, width, height, crop, image_format = signing.loads(value, salt=SALT)
+    with _changed:
+        while True:
+            future = _pending.get(path)
+            if future is not None:
+                break
+            if os.path.exists(path):
+                return path
+            if len(_pending) < settings.IMAGE_RESIZE_QUEUE:
+                future = pool().submit(
+                    resize,
+                    os.path.join(settings.MEDIA_ROOT, name),
+                    path, width, height, crop,
+                    target_format(name, image_format),
+                    settings.IMAGE_QUALITY,
+                    settings.IMAGE_MAX_PIXELS,
+                )
+                _pending[path] = future
+                future.add_done_callback(_finished(path))
+                break
+            if not block:
+                raise Busy
+            _changed.wait()
+    future.result(timeout=settings.IMAGE_RESIZE_TIMEOUT)
+    return path
@@ -0,0 +1,160 @@
+import random
+import re
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+WRITTEN_KEY = 'replica:written'
+WRITE = re.compile(
+    r'\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE'
+    r'|DELETE\s+FROM)\s+"?(\w+)',
+    re.IGNORECASE,
+)
+SCHEMA_CHANGE = re.compile(r'\s*(?:CREATE|DROP|ALTER)\b', re.IGNORECASE)
+
+_state = threading.local()
+
+
+def _synced_key(alias):
+    return f'replica:synced:{alias}'
+
+
+def mark_written():
+    """Время последней закоммиченной записи в модели REPLICA_APPS."""
+    cache.set(WRITTEN_KEY, time.time(), None)
+
+
+def mark_synced(alias, started):
+    """Время начала копирования основной базы в реплику alias."""
+    cache.set(_synced_key(alias), started, None)
+
+
+def _replicated_tables():
+    return {
+        model._meta.db_table
+        for label in settings.REPLICA_APPS
+        for model in apps.get_app_config(label).get_models(
+            include_auto_created=True)
+    }
+
+
+def _is_replicated_write(sql):
+    if SCHEMA_CHANGE.match(sql):
+        return True
+    match = WRITE.match(sql)
+    return bool(match) and match.group(1) in _replicated_tables()
+
+
+def _record_write(execute, sql, params, many, context):
+    result = execute(sql, params, many, context)
+    if _is_replicated_write(sql):
+        connection = context['connection']
+        if not connection.in_atomic_block:
+            mark_written()
+        elif not any(
+            func is mark_written for _, func in connection.run_on_commit
+        ):
+            connection.on_commit(mark_written)
+    return result
+
+
+def track_writes(sender, connection, **kwargs):
+    """
+    connection_created: запись в таблицы REPLICA_APPS через основную
+    базу отмечается после коммита, откуда бы она ни шла — из вьюх,
+    команд, сигналов или migrate. Подключается в CoreConfig.ready.
+    """
+    if connection.alias not in settings.DATABASE_REPLICAS:
+        connection.execute_wrappers.append(_record_write)
+
+
+def readable_replicas():
+    """
+    Реплики для чтения и те из них, что отстают. Реплика, скопированная
+    после последней записи, свежая. Отстающая годится, пока с копии
+    прошло не больше REPLICA_MAX_LAG секунд, но построенное по ней не
+    кешируется (read_stale): иначе кеш сохранил бы старые данные под
+    ключом текущего поколения.
+    """
+    keys = {_synced_key(alias): alias for alias in settings.DATABASE_REPLICAS}
+    values = cache.get_many([WRITTEN_KEY, *keys])
+    written = values.get(WRITTEN_KEY, 0)
+    oldest = time.time() - settings.REPLICA_MAX_LAG
+    readable, stale = [], []
+    for key, alias in keys.items():
+        synced = values.get(key)
+        if synced is None:
+            continue
+        if synced >= written:
+            readable.append(alias)
+        elif synced >= oldest:
+            readable.append(alias)
+            stale.append(alias)
+    return readable, stale
+
+
+def fresh_replicas():
+    """Реплики, скопированные после последней записи."""
+    readable, stale = readable_replicas()
+    return [alias for alias in readable if alias not in stale]
+
+
+def use_replica(aliases, stale=()):
+    """
+    Дальнейшие чтения моделей REPLICA_APPS в этом потоке идут на
+    реплики aliases, пока не было записи: после неё читается основная
+    база. Чтение с реплики из stale отмечается для read_stale().
+    """
+    _state.replicas = aliases
+    _state.stale = set(stale)
+
+
+def wrote():
+    return getattr(_state, 'wrote', False)
+
+
+def read_stale():
+    """Было ли в этом потоке чтение с отстающей реплики."""
+    return getattr(_state, 'read_stale', False)
+
+
+def reset():
+    _state.replicas, _state.stale = [], set()
+    _state.wrote = _state.read_stale = False
+
+
+class ReplicaRouter:
+    """
+    Запись всегда в default. Чтение — на случайную реплику из
+    DATABASE_REPLICAS, если включено DATABASE_REPLICA_READS и запрос
+    помечен use_replica(). Схема на реплики не мигрируется: их
+    копирует из основной базы команда sync_replica.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(_state, 'replicas', None)
+        if (
+            settings.DATABASE_REPLICA_READS
+            and replicas
+            and not wrote()
+            and model._meta.app_label in settings.REPLICA_APPS
+        ):
+            alias = random.choice(replicas)
+            if alias in _state.stale:
+                _state.read_stale = True
+            return alias
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in settings.REPLICA_APPS:
+            _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,92 @@
+import hashlib
+import math
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+
+from . import routers
+
+# Как часто ожидающий запрос проверяет, не готово ли значение.
+POLL_INTERVAL = 0.05
+
+
+def _refresh_due(expires, delta, now):
+    """
+    Вероятностное раннее обновление (XFetch): чем ближе срок и чем
+    дольше пересчёт, тем вероятнее обновить значение заранее.
+    """
+    if expires is None:
+        return False
+    jitter = -delta * settings.STAMPEDE_BETA * math.log(1 - random.random())
+    return now + jitter >= expires
+
+
+def _recompute(key, compute, timeout, cache, should_cache):
+    started = time.time()
+    value = compute()
+    finished = time.time()
+    if routers.read_stale():
+        # Построено по отстающей реплике: в кеш не кладём.
+        return value
+    if should_cache is None or should_cache(value):
+        expires = stored = None
+        if timeout is not None:
+            expires = finished + timeout
+            stored = timeout + settings.STAMPEDE_GRACE
+        cache.set(key, (value, expires, finished - started), stored)
+    return value
+
+
+def get_or_set(key, compute, timeout, cache=None, should_cache=None):
+    """
+    Значение из кеша, а при промахе или скором истечении — результат
+    compute(). Пересчитывает только тот, кто взял блокировку; остальные
+    получают старое значение (оно хранится ещё STAMPEDE_GRACE секунд
+    после срока) или ждут до STAMPEDE_WAIT секунд.
+    """
+    cache = cache or default_cache
+    entry = cache.get(key)
+    if entry is not None:
+        value, expires, delta = entry
+        if not _refresh_due(expires, delta, time.time()):
+            return value
+    lock = f'{key}:lock'
+    if cache.add(lock, 1, settings.STAMPEDE_LOCK_TIMEOUT):
+        try:
+            return _recompute(key, compute, timeout, cache, should_cache)
+        finally:
+            cache.delete(lock)
+    if entry is not None:
+        return entry[0]
+    deadline = time.time() + settings.STAMPEDE_WAIT
+    while time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return compute()
+
+
+def single_flight(timeout, key=None):
+    """
+    Декоратор для get_or_set. key(*args, **kwargs) строит ключ; по
+    умолчанию это имя функции и хеш аргументов.
+    """
+    def decorator(function):
+        prefix = (
+            f'single_flight:{function.__module__}.{function.__qualname__}')
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if key is not None:
+                name = key(*args, **kwargs)
+            else:
+                digest = hashlib.md5(repr((args, kwargs)).encode())
+                name = f'{prefix}:{digest.hexdigest()}'
+            return get_or_set(
+                name, lambda: function(*args, **kwargs), timeout)
+        return wrapper
+    return decorator
@@ -0,0 +1,49 @@
+from django import template
+
+from core import holes
+
+register = template.Library()
+
+
+class HoleNode(template.Node):
+    def __init__(self, template_name, kwargs):
+        self.template_name = template_name
+        self.kwargs = kwargs
+
+    def render(self, context):
+        name = self.template_name.resolve(context)
+        kwargs = {
+            key: value.resolve(context) for key, value in self.kwargs.items()
+        }
+        request = context.get('request')
+        if holes.punching(request):
+            return holes.marker(name, kwargs)
+        extra = {
+            key: value
+            for key, value in holes.extra(request, name, kwargs).items()
+            if key not in context
+        }
+        with context.push(**extra, **kwargs):
+            return context.template.engine.get_template(name).render(context)
+
+
+@register.tag
+def hole(parser, token):
+    """
+    Персональная часть страницы:
+
+        {% hole 'posts/includes/switcher.html' index=True %}
+
+    Обычно работает как include. Когда страница рисуется как общая
+    оболочка (core.holes.punching), на месте дыры остаётся метка, а
+    шаблон дорисовывается для каждого запроса (core.holes.fill) только
+    из переданных аргументов и контекста запроса.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f'{bits[0]}: нужен шаблон')
+    kwargs = template.base.token_kwargs(bits[2:], parser)
+    if len(kwargs) != len(bits) - 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]}: аргументы передаются как имя=значение')
+    return HoleNode(parser.compile_filter(bits[1]), kwargs)
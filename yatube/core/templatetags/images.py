@@ -0,0 +1,80 @@
+from django import template
+from django.conf import settings
+from django.utils.html import format_html, format_html_join
+
+from core import resizer
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_url(image, geometry, crop=False, format=None):
+    """
+    Адрес уменьшенной картинки для /img/: {% image_url post.image '300' %}.
+    Файл при рендере не открывается, ресайз будет при первом запросе.
+    """
+    if not image:
+        return ''
+    return resizer.url(getattr(image, 'name', image), geometry, crop, format)
+
+
+def _display_size(intrinsic_width, intrinsic_height, width, height):
+    if not (intrinsic_width and intrinsic_height):
+        return width, height
+    if width:
+        return width, round(width * intrinsic_height / intrinsic_width)
+    if height:
+        return round(height * intrinsic_width / intrinsic_height), height
+    return intrinsic_width, intrinsic_height
+
+
+@register.simple_tag
+def responsive_image(image, intrinsic_width=None, intrinsic_height=None,
+                     width=None, height=None, sizes=None, css=''):
+    """
+    <picture> с вариантами IMAGE_VARIANT_WIDTHS в WebP и исходном
+    формате. width/height у <img> считаются из сохранённых размеров
+    картинки, так что файл при рендере не открывается:
+
+        {% responsive_image post.image post.image_width post.image_height
+           width=260 css="cared-img" %}
+    """
+    if not image:
+        return ''
+    name = getattr(image, 'name', image)
+    original = resizer.target_format(name, None)
+    display_width, display_height = _display_size(
+        intrinsic_width, intrinsic_height, width, height)
+    sizes = sizes or (f'{display_width}px' if display_width else '100vw')
+    widths = resizer.variant_widths(intrinsic_width)
+    formats = {}
+    for image_format in settings.IMAGE_VARIANT_FORMATS:
+        formats.setdefault(
+            resizer.target_format(name, image_format), image_format)
+    sources, srcset = [], ''
+    for target, image_format in formats.items():
+        candidates = ', '.join(
+            f'{resizer.url(name, str(size), image_format=image_format)} '
+            f'{size}w'
+            for size in widths
+        )
+        if target == original:
+            srcset = candidates
+        else:
+            sources.append((resizer.MIME_TYPES[target], candidates, sizes))
+    fallback = next(
+        (size for size in widths if size >= (display_width or 0)),
+        widths[-1])
+    dimensions = ''
+    if display_width and display_height:
+        dimensions = format_html(
+            ' width="{}" height="{}"', display_width, display_height)
+    return format_html(
+        '<picture>{}<img class="{}" src="{}" srcset="{}" sizes="{}"{} '
+        'loading="lazy" decoding="async" alt=""></picture>',
+        format_html_join(
+            '', '<source type="{}" srcset="{}" sizes="{}">', sources),
+        css,
+        resizer.url(name, str(fallback), image_format=formats.get(original)),
+        srcset, sizes, dimensions,
+    )
@@ -0,0 +1,57 @@
+from django import template
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode
+
+from core.stampede import get_or_set
+
+register = template.Library()
+
+
+class StampedeCacheNode(CacheNode):
+    def render(self, context):
+        try:
+            expire_time = self.expire_time_var.resolve(context)
+        except template.VariableDoesNotExist:
+            raise template.TemplateSyntaxError(
+                f'stampede_cache: нет переменной {self.expire_time_var.var}')
+        if expire_time is not None:
+            expire_time = int(expire_time)
+        cache_name = 'default'
+        if self.cache_name:
+            cache_name = self.cache_name.resolve(context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return get_or_set(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time,
+            cache=caches[cache_name],
+        )
+
+
+@register.tag
+def stampede_cache(parser, token):
+    """
+    Как {% cache %}, но фрагмент пересчитывает один запрос, а остальные
+    получают старую версию или ждут её (core.stampede.get_or_set):
+
+        {% stampede_cache timeout name var1 var2 [using="cache"] %}
+        ...
+        {% endstampede_cache %}
+    """
+    nodelist = parser.parse(('endstampede_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]}: нужны время жизни и имя фрагмента')
+    cache_name = None
+    if len(tokens) > 3 and tokens[-1].startswith('using='):
+        cache_name = parser.compile_filter(tokens.pop()[len('using='):])
+    return StampedeCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+        cache_name,
+    )
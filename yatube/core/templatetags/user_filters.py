@@ -5,3 +5,14 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.simple_tag(takes_context=True)
+def query_replace(context, **kwargs):
+    """Текущий query string с заменой параметров (пустые удаляются)."""
+    query = context['request'].GET.copy()
+    for key, value in kwargs.items():
+        query.pop(key, None)
+        if value not in (None, ''):
+            query[key] = str(value)
+    return query.urlencode()
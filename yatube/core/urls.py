@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('', views.profiles, name='profiles'),
+    path('<str:name>/', views.profile_capture, name='profile_capture'),
+]
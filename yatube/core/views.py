@@ -1,4 +1,15 @@
+from concurrent.futures import TimeoutError
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core import signing
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+
+from . import profiling, resizer
+
+SORTS = ('cumulative', 'tottime', 'calls')
 
 
 def page_not_found(request, exception):
@@ -15,3 +26,49 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def profiles(request):
+    return render(
+        request, 'core/profiles.html', {'captures': profiling.captures()})
+
+
+@staff_member_required
+def profile_capture(request, name):
+    try:
+        if 'download' in request.GET:
+            return FileResponse(
+                open(profiling.path(name), 'rb'),
+                as_attachment=True,
+                filename=name,
+            )
+        sort = request.GET.get('sort', 'cumulative')
+        if sort not in SORTS:
+            sort = 'cumulative'
+        text = profiling.summary(name, sort=sort)
+    except FileNotFoundError:
+        raise Http404(name)
+    return HttpResponse(text, content_type='text/plain; charset=utf-8')
+
+
+def image(request, token):
+    """
+    Картинка по подписанным параметрам: при первом запросе её делает
+    пул процессов, дальше файл отдаётся из дискового кеша.
+    """
+    try:
+        path = resizer.ensure(token)
+    except signing.BadSignature:
+        raise Http404('Неверная подпись') from None
+    except FileNotFoundError:
+        raise Http404('Нет исходной картинки') from None
+    except (resizer.Busy, TimeoutError):
+        response = HttpResponse('Картинка готовится', status=503)
+        response['Retry-After'] = '1'
+        return response
+    response = FileResponse(open(path, 'rb'))
+    patch_cache_control(
+        response, public=True, immutable=True,
+        max_age=settings.IMAGE_CACHE_MAX_AGE)
+    return response
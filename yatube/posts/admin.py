@@ -1,18 +1,44 @@
 from email.headerregistry import Group
 from django.contrib import admin
-from .models import Post, Group, Comment, Follow
+from django.db.models.expressions import RawSQL
+from .forms import PostForm
+from .models import Post, Group, Comment, Follow, UserStats
+from .search import match_expression, matching_ids
+
+
+class PostAdminForm(PostForm):
+    """Картинки из админки нормализуются так же, как на сайте."""
+
+    class Meta(PostForm.Meta):
+        fields = '__all__'
+        labels = {}
+        help_texts = {}
 
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'author', 'created', 'group')
+    form = PostAdminForm
+    list_display = (
+        'pk', 'text', 'author', 'created', 'group', 'comments_count')
     list_editable = ('group',)
+    readonly_fields = ('comments_count',)
     search_fields = ('text',)
     list_filter = ('created',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not match_expression(search_term):
+            return queryset, False
+        sql, params = matching_ids(search_term)
+        return queryset.filter(pk__in=RawSQL(sql, params)), False
+
+    def save_model(self, request, obj, form, change):
+        # form.save() ещё и освобождает заменённую картинку.
+        form.save()
+
 
 class GroupAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'title', 'slug', 'description')
+    list_display = ('pk', 'title', 'slug', 'description', 'posts_count')
+    readonly_fields = ('posts_count',)
     empty_value_display = '-пусто-'
 
 
@@ -26,7 +52,14 @@ class FollowAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        'user', 'posts_count', 'followers_count', 'following_count')
+    readonly_fields = list_display
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
-admin.site.register(Follow, FollowAdmin)
\ No newline at end of file
+admin.site.register(Follow, FollowAdmin)
+admin.site.register(UserStats, UserStatsAdmin)
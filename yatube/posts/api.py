@@ -0,0 +1,229 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+from core.paginator import CursorPaginator
+from .models import Comment, Group, Post
+from .timeline import TimelinePaginator
+
+User = get_user_model()
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+ENCODER = DjangoJSONEncoder(ensure_ascii=False)
+
+# Поле ответа -> поле для values().
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+GROUP_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'slug': 'slug',
+    'description': 'description',
+    'posts_count': 'posts_count',
+}
+PROFILE_FIELDS = {
+    'id': 'id',
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'posts_count': 'stats__posts_count',
+    'followers_count': 'stats__followers_count',
+    'following_count': 'stats__following_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+    'post': 'post_id',
+}
+
+
+def _media_url(value):
+    return f'{settings.MEDIA_URL}{value}' if value else None
+
+
+def _count(value):
+    return value or 0
+
+
+CONVERTERS = {
+    'image': _media_url,
+    'posts_count': _count,
+    'followers_count': _count,
+    'following_count': _count,
+}
+
+
+class ApiError(ValueError):
+    status = 400
+
+
+class Unauthorized(ApiError):
+    status = 401
+
+
+class NotFound(ApiError):
+    status = 404
+
+
+def json_response(request, data, status=200):
+    """JSON с ETag по содержимому: совпадение If-None-Match даёт 304."""
+    body = ENCODER.encode(data).encode()
+    etag = quote_etag(hashlib.md5(body).hexdigest())
+    response = None
+    if status == 200:
+        response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(
+            body, content_type='application/json', status=status)
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def api_view(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return json_response(
+                request, {'error': str(error)}, status=error.status)
+    return wrapper
+
+
+def selected(request, available, required=()):
+    """
+    Поля ответа из ?fields= (по умолчанию все) и поля для values():
+    к выбранным добавляются нужные курсору.
+    """
+    raw = request.GET.get('fields')
+    if raw:
+        names = [name.strip() for name in raw.split(',') if name.strip()]
+    else:
+        names = list(available)
+    unknown = set(names) - set(available)
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    lookups = [available[name] for name in names] + list(required)
+    return names, list(dict.fromkeys(lookups))
+
+
+def serialize(rows, names, available):
+    columns = [
+        (name, available[name], CONVERTERS.get(name)) for name in names
+    ]
+    return [
+        {
+            name: convert(row[lookup]) if convert else row[lookup]
+            for name, lookup, convert in columns
+        }
+        for row in rows
+    ]
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit должен быть числом') from None
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def page_response(request, paginator, names, available):
+    page = paginator.get_cursor_page(request.GET.get('cursor'))
+    return json_response(request, {
+        'results': serialize(page.object_list, names, available),
+        'next': _link(request, page.next_cursor),
+        'previous': _link(request, page.previous_cursor),
+    })
+
+
+class RowTimelinePaginator(TimelinePaginator):
+    """Лента подписок строками values() вместо объектов Post."""
+
+    def __init__(self, user, per_page, lookups):
+        super().__init__(user, per_page)
+        self.lookups = lookups
+
+    def fetch(self, pks):
+        rows = Post.objects.filter(pk__in=pks).values(*self.lookups)
+        return {row['id']: row for row in rows}
+
+
+@api_view
+def posts(request):
+    names, lookups = selected(request, POST_FIELDS, ('created', 'id'))
+    queryset = Post.objects.all()
+    if request.GET.get('group'):
+        queryset = queryset.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        queryset = queryset.filter(author__username=request.GET['author'])
+    paginator = CursorPaginator(
+        queryset.values(*lookups), page_size(request))
+    return page_response(request, paginator, names, POST_FIELDS)
+
+
+@api_view
+def groups(request):
+    names, lookups = selected(request, GROUP_FIELDS, ('id',))
+    paginator = CursorPaginator(
+        Group.objects.values(*lookups), page_size(request),
+        ordering=('pk',))
+    return page_response(request, paginator, names, GROUP_FIELDS)
+
+
+@api_view
+def profile(request, username):
+    names, lookups = selected(request, PROFILE_FIELDS)
+    row = User.objects.filter(username=username).values(*lookups).first()
+    if row is None:
+        raise NotFound(f'Нет пользователя {username}')
+    return json_response(
+        request, serialize([row], names, PROFILE_FIELDS)[0])
+
+
+@api_view
+def comments(request, post_id):
+    names, lookups = selected(request, COMMENT_FIELDS, ('created', 'id'))
+    if not Post.objects.filter(pk=post_id).exists():
+        raise NotFound(f'Нет поста {post_id}')
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).values(*lookups),
+        page_size(request),
+        ordering=('created', 'pk'),
+    )
+    return page_response(request, paginator, names, COMMENT_FIELDS)
+
+
+@api_view
+def follow(request):
+    if not request.user.is_authenticated:
+        raise Unauthorized('Нужна авторизация')
+    names, lookups = selected(request, POST_FIELDS, ('created', 'id'))
+    paginator = RowTimelinePaginator(
+        request.user, page_size(request), lookups)
+    return page_response(request, paginator, names, POST_FIELDS)
@@ -0,0 +1,427 @@
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models import Count, Max, Min
+from django.template.base import Template
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, reverse
+
+from . import api, counters, urls
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+SCALES = {
+    'small': 10_000,
+    'medium': 100_000,
+    'large': 1_000_000,
+}
+WORDS = (
+    'кот собака город море лес река дом солнце дождь снег книга музыка '
+    'работа отпуск поезд самолёт утро вечер друг семья кофе чай сад небо'
+).split()
+QUERY_STRINGS = {
+    'search': '?q=кот+город',
+}
+# URL, которые пишут через форму, замеряются POST с этими данными:
+# GET отдал бы пустую форму или редирект.
+FORMS = {
+    'post_create': {'text': 'Пост из бенчмарка'},
+    'post_edit': {'text': 'Правка из бенчмарка'},
+    'add_comment': {'text': 'Комментарий из бенчмарка'},
+}
+# Голый SQLite для сравнения в concurrency(): журнал отката вместо WAL,
+# без ожидания блокировок и без повторов записи.
+BASELINE_DB = {
+    'SQLITE_PRAGMAS': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 0,
+    },
+    'DB_WRITE_RETRIES': 0,
+}
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'rows', 'render_ms')
+
+
+def _text(rng, length=30):
+    return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+
+def _bulk(model, objects, batch_size):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            batch = []
+    model.objects.bulk_create(batch)
+
+
+def seed(posts, users=None, groups=50, follows=20, comments=2,
+         batch_size=5000, random_seed=0, log=print, stdout=None):
+    """
+    Наполняет базу bulk-вставками: posts постов, по умолчанию один
+    пользователь на 20 постов, follows подписок на пользователя и
+    comments комментариев на пост в среднем. Сигналы bulk_create не
+    шлёт, поэтому счётчики и ленты пересчитываются в конце.
+    """
+    rng = random.Random(random_seed)
+    users = users or max(posts // 20, 2)
+    with transaction.atomic():
+        log(f'Пользователи: {users}')
+        _bulk(User, (
+            User(username=f'bench{i}', password='!') for i in range(users)
+        ), batch_size)
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        log(f'Группы: {groups}')
+        _bulk(Group, (
+            Group(title=f'Группа {i}', slug=f'bench-{i}',
+                  description=_text(rng, 10))
+            for i in range(groups)
+        ), batch_size)
+        group_ids = list(Group.objects.values_list('pk', flat=True))
+        log(f'Посты: {posts}')
+        _bulk(Post, (
+            Post(
+                text=_text(rng),
+                author_id=rng.choice(user_ids),
+                group_id=rng.choice(group_ids) if rng.random() < 0.7 else None,
+            )
+            for _ in range(posts)
+        ), batch_size)
+        first, last = Post.objects.aggregate(
+            Min('pk'), Max('pk')).values()
+        log(f'Подписки: {users * follows}')
+        popular = user_ids[:max(len(user_ids) // 100, 1)]
+        pairs = set()
+        for user_id in user_ids:
+            authors = rng.sample(user_ids, min(follows, len(user_ids)))
+            authors[0] = rng.choice(popular)
+            pairs.update(
+                (user_id, author) for author in authors if author != user_id)
+        _bulk(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs
+        ), batch_size)
+        log(f'Комментарии: {posts * comments}')
+        _bulk(Comment, (
+            Comment(
+                text=_text(rng, 8),
+                post_id=rng.randint(first, last),
+                author_id=rng.choice(user_ids),
+            )
+            for _ in range(posts * comments)
+        ), batch_size)
+        log('Счётчики и ленты')
+        counters.recount()
+    cache.clear()
+    call_command('rebuild_timelines', stdout=stdout)
+
+
+def targets():
+    """Аргументы для каждого URL posts.urls из засеянных данных."""
+    reader = (
+        User.objects.annotate(n=Count('follower')).order_by('-n').first()
+    )
+    author = (
+        User.objects.exclude(pk=reader.pk)
+        .order_by('-stats__followers_count').first()
+    )
+    post = Post.objects.order_by('-comments_count').first()
+    own = Post.objects.filter(author=reader).first() or Post.objects.create(
+        author=reader, text=_text(random.Random(0)))
+    group = Group.objects.order_by('-posts_count').first()
+    values = {
+        'slug': group.slug,
+        'username': author.username,
+        'post_id': post.pk,
+        'kind': 'posts',
+    }
+    overrides = {'post_edit': {'post_id': own.pk}}
+    found = {}
+    for pattern in urls.urlpatterns:
+        if not isinstance(pattern, URLPattern):
+            continue
+        kwargs = {
+            name: values[name]
+            for name in pattern.pattern.converters
+        }
+        kwargs.update(overrides.get(pattern.name, {}))
+        found[pattern.name] = reverse(
+            f'{urls.app_name}:{pattern.name}', kwargs=kwargs,
+        ) + QUERY_STRINGS.get(pattern.name, '')
+    return reader, found, _resets(reader, author)
+
+
+def _resets(reader, author):
+    """
+    Подписка и отписка меняют данные только раз; перед каждым замером
+    прежнее состояние возвращается, чтобы мерилась сама запись.
+    """
+    follows = Follow.objects.filter(user=reader, author=author)
+    return {
+        'profile_follow': follows.delete,
+        'profile_unfollow': lambda: Follow.objects.get_or_create(
+            user=reader, author=author),
+    }
+
+
+@contextmanager
+def template_timer():
+    """Время рендера шаблонов верхнего уровня (вложенные не считаются)."""
+    original = Template.render
+    state = {'depth': 0, 'seconds': 0.0}
+
+    def render(self, context):
+        state['depth'] += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            state['depth'] -= 1
+            if not state['depth']:
+                state['seconds'] += time.perf_counter() - started
+
+    Template.render = render
+    try:
+        yield state
+    finally:
+        Template.render = original
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(share * len(ordered)) - 1))
+    return ordered[index]
+
+
+def rows_fetched(queries):
+    total = 0
+    with connection.cursor() as cursor:
+        for query in queries:
+            if query['sql'].lstrip().upper().startswith('SELECT'):
+                cursor.execute(f'SELECT COUNT(*) FROM ({query["sql"]})')
+                total += cursor.fetchone()[0]
+    return total
+
+
+def measure(client, url, iterations, warm=False, data=None, reset=None):
+    """
+    Замер URL: GET или, если переданы данные формы, POST. reset()
+    вызывается перед каждым запросом и в замер не входит.
+    """
+    if data is None:
+        request = client.get
+    else:
+        request = partial(client.post, data=data)
+    timings = []
+    for _ in range(iterations):
+        if reset:
+            reset()
+        if not warm:
+            cache.clear()
+        started = time.perf_counter()
+        response = request(url)
+        timings.append((time.perf_counter() - started) * 1000)
+    if reset:
+        reset()
+    if not warm:
+        cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        with template_timer() as rendering:
+            request(url)
+    return {
+        'status': response.status_code,
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'queries': len(queries),
+        'rows': rows_fetched(queries.captured_queries),
+        'render_ms': round(rendering['seconds'] * 1000, 3),
+    }
+
+
+def run(iterations, warm=False, log=print):
+    reader, found, resets = targets()
+    client = Client()
+    client.force_login(reader)
+    results = {}
+    for name, url in found.items():
+        results[name] = measure(
+            client, url, iterations, warm,
+            data=FORMS.get(name), reset=resets.get(name),
+        )
+        log(f'{name:20} {url:40} {results[name]}')
+    return results
+
+
+def _load(role, client, url, deadline, timings, errors, lock):
+    try:
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                if role == 'read':
+                    client.get(url)
+                else:
+                    client.post(url, {'text': 'Нагрузочный комментарий'})
+            except OperationalError:
+                with lock:
+                    errors[role] += 1
+                continue
+            timings[role].append((time.perf_counter() - started) * 1000)
+    finally:
+        connection.close()
+
+
+def _concurrency_run(readers, writers, seconds):
+    users = list(User.objects.order_by('pk')[:readers + writers])
+    post = Post.objects.order_by('-pk').first()
+    timings = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+    threads = []
+    for index, user in enumerate(users):
+        role = 'read' if index < readers else 'write'
+        client = Client()
+        client.force_login(user)
+        url = reverse('posts:index') if role == 'read' else reverse(
+            'posts:add_comment', args=[post.pk])
+        threads.append(threading.Thread(
+            target=_load,
+            args=(role, client, url, deadline, timings, errors, lock),
+        ))
+    connection.close()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        role: {
+            'ops_per_second': round(len(timings[role]) / seconds, 1),
+            'p95_ms': round(percentile(timings[role], 0.95), 3)
+            if timings[role] else None,
+            'locked_errors': errors[role],
+        }
+        for role in timings
+    }
+
+
+def concurrency(readers=4, writers=2, seconds=5.0):
+    """
+    readers потоков читают главную, writers потоков комментируют пост,
+    у каждого своё соединение. Прогон дважды: на голом SQLite
+    (BASELINE_DB) и с настройками проекта; для каждой роли —
+    операций в секунду, p95 и число ошибок «database is locked».
+    """
+    results = {}
+    with override_settings(**BASELINE_DB):
+        connection.close()
+        results['baseline'] = _concurrency_run(readers, writers, seconds)
+    connection.close()
+    results['tuned'] = _concurrency_run(readers, writers, seconds)
+    return results
+
+
+def _serialize_models(limit):
+    posts = Post.objects.select_related('author', 'group')[:limit]
+    return [
+        {
+            'id': post.pk,
+            'text': post.text,
+            'created': post.created,
+            'author': post.author.username,
+            'group': post.group.slug if post.group else None,
+            'image': post.image.url if post.image else None,
+            'comments_count': post.comments_count,
+        }
+        for post in posts
+    ]
+
+
+def _serialize_values(limit):
+    rows = Post.objects.values(*api.POST_FIELDS.values())[:limit]
+    return api.serialize(rows, list(api.POST_FIELDS), api.POST_FIELDS)
+
+
+def throughput(limit=10000, repeat=3):
+    """
+    Строк в секунду при сериализации постов в JSON: путь API через
+    values() и для сравнения через объекты моделей. Берётся лучший
+    из repeat прогонов.
+    """
+    results = {}
+    for name, serialize in (
+        ('api_values', _serialize_values),
+        ('api_models', _serialize_models),
+    ):
+        best, rows = None, 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = serialize(limit)
+            api.ENCODER.encode(data)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+            rows = len(data)
+        results[name] = {
+            'rows': rows,
+            'rows_per_second': round(rows / max(best, 1e-9)),
+        }
+    return results
+
+
+def compare(baseline, current, threshold):
+    """
+    Строки отчёта и список регрессий: метрика выросла (а пропускная
+    способность упала) больше, чем на threshold процентов.
+    """
+    lines, regressions = [], []
+    for name, metrics in current['views'].items():
+        old = baseline['views'].get(name)
+        if old is None:
+            lines.append(f'{name}: нет в базовом прогоне')
+            continue
+        for metric in METRICS:
+            before, after = old.get(metric), metrics.get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before * 100 if before else (
+                0.0 if after == before else float('inf'))
+            line = f'{name:20} {metric:10} {before:>10} -> {after:>10} '
+            line += f'({change:+.1f}%)'
+            if change > threshold:
+                line += '  РЕГРЕССИЯ'
+                regressions.append((name, metric, change))
+            lines.append(line)
+    for name, metrics in current.get('throughput', {}).items():
+        old = baseline.get('throughput', {}).get(name)
+        if not old or not old['rows_per_second']:
+            continue
+        before, after = old['rows_per_second'], metrics['rows_per_second']
+        change = (after - before) / before * 100
+        line = f'{name:20} {"rows/s":10} {before:>10} -> {after:>10} '
+        line += f'({change:+.1f}%)'
+        if -change > threshold:
+            line += '  РЕГРЕССИЯ'
+            regressions.append((name, 'rows_per_second', change))
+        lines.append(line)
+    return lines, regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def dump(path, data):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, indent=2)
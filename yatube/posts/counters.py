@@ -0,0 +1,104 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Модель -> (внешний ключ, счётчик на связанной записи).
+COUNTED = {
+    Post: (('author', 'posts_count'), ('group', 'posts_count')),
+    Comment: (('post', 'comments_count'),),
+    Follow: (('author', 'followers_count'), ('user', 'following_count')),
+}
+
+
+def bump(model, pk, **deltas):
+    """Уменьшение не опускает разъехавшийся счётчик ниже нуля."""
+    return model.objects.filter(pk=pk).update(**{
+        name: F(name) + delta if delta > 0 else Greatest(F(name) + delta, 0)
+        for name, delta in deltas.items()
+    })
+
+
+def bump_user(user_id, **deltas):
+    """
+    Строка UserStats заводится при первом увеличении; уменьшение
+    отсутствующей строки пропускается (пользователь может удаляться).
+    """
+    if bump(UserStats, user_id, **deltas):
+        return
+    if any(delta > 0 for delta in deltas.values()):
+        UserStats.objects.get_or_create(user_id=user_id)
+        bump(UserStats, user_id, **deltas)
+
+
+def _bump_target(instance, field_name, counter, pk, delta):
+    if pk is None:
+        return
+    model = instance._meta.get_field(field_name).related_model
+    if model is User:
+        bump_user(pk, **{counter: delta})
+    else:
+        bump(model, pk, **{counter: delta})
+
+
+def remember(instance):
+    """Запоминает старые внешние ключи перед изменением записи."""
+    fields = [f'{name}_id' for name, _ in COUNTED[type(instance)]]
+    instance._counted = type(instance).objects.filter(
+        pk=instance.pk).values(*fields).first()
+
+
+def count_created(instance):
+    for name, counter in COUNTED[type(instance)]:
+        pk = getattr(instance, f'{name}_id')
+        _bump_target(instance, name, counter, pk, 1)
+
+
+def count_changed(instance):
+    old = getattr(instance, '_counted', None) or {}
+    for name, counter in COUNTED[type(instance)]:
+        attname = f'{name}_id'
+        new_pk = getattr(instance, attname)
+        old_pk = old.get(attname, new_pk)
+        if old_pk != new_pk:
+            _bump_target(instance, name, counter, old_pk, -1)
+            _bump_target(instance, name, counter, new_pk, 1)
+
+
+def count_deleted(instance):
+    for name, counter in COUNTED[type(instance)]:
+        pk = getattr(instance, f'{name}_id')
+        _bump_target(instance, name, counter, pk, -1)
+
+
+def user_stats(user):
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=user)
+
+
+def _count(model, field):
+    rows = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def recount():
+    """Пересчитывает все счётчики по исходным таблицам."""
+    missing = User.objects.filter(
+        stats__isnull=True).values_list('pk', flat=True)
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in missing], ignore_conflicts=True)
+    UserStats.objects.update(
+        posts_count=_count(Post, 'author'),
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
+    Group.objects.update(posts_count=_count(Post, 'group'))
+    Post.objects.update(comments_count=_count(Comment, 'post'))
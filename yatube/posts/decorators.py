@@ -0,0 +1,116 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+from core import holes, routers
+from core.stampede import get_or_set
+from . import generation
+
+
+def _page_key(request, version):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'anonymous_page:{version}:{path}'
+
+
+def _shell_key(request, version):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page_shell:{version}:{path}'
+
+
+def _cacheable(response):
+    return response.status_code == 200 and not response.cookies
+
+
+def _last_modified(changed):
+    """
+    Last-Modified с точностью до секунды: конец секунды последней смены.
+    Пока эта секунда не кончилась, следующая запись получила бы то же
+    время, поэтому валидатором служит только ETag.
+    """
+    seconds = int(changed) + 1
+    if time.time() < seconds:
+        return None
+    return seconds
+
+
+def anonymous_page_cache(view):
+    """
+    Кеш целой страницы для гостей. ETag и Last-Modified берутся из
+    поколения постов, поэтому повторный запрос получает 304 без
+    обращения к базе и шаблонам. После смены поколения страницу строит
+    один запрос, остальные ждут его. Авторизованные идут мимо кеша.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or request.user.is_authenticated
+        ):
+            return view(request, *args, **kwargs)
+        version = generation.get()
+        etag = quote_etag(str(version))
+        last_modified = _last_modified(generation.changed())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = get_or_set(
+                _page_key(request, version),
+                lambda: view(request, *args, **kwargs),
+                settings.ANONYMOUS_PAGE_CACHE_TIMEOUT,
+                should_cache=_cacheable,
+            )
+        if routers.read_stale():
+            # Страница по отстающей реплике не должна получать 304.
+            patch_cache_control(response, no_cache=True)
+            return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, max_age=0, must_revalidate=True)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
+
+
+def shared_shell_cache(view):
+    """
+    Кеш страницы для авторизованных: одна оболочка на всех, в которой
+    персональные части ({% hole %}) оставлены метками. Метки заполняются
+    для каждого запроса отдельно, дорогой список постов рисуется один
+    раз. Всё вне меток, включая счётчики подписок на профиле, должно
+    менять поколение постов. Гости идут мимо: для них есть
+    anonymous_page_cache.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or not request.user.is_authenticated
+        ):
+            return view(request, *args, **kwargs)
+
+        def shell():
+            request.punch_holes = True
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                request.punch_holes = False
+
+        response = get_or_set(
+            _shell_key(request, generation.get()),
+            shell,
+            settings.SHELL_CACHE_TIMEOUT,
+            should_cache=_cacheable,
+        )
+        response.content = holes.fill(
+            request, response.content.decode(response.charset))
+        patch_cache_control(response, private=True)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
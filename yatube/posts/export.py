@@ -0,0 +1,135 @@
+import csv
+import datetime as dt
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Comment, Follow, Post
+
+CHUNK_SIZE = 2000
+FORMATS = ('jsonl', 'csv')
+EXPORTS = {
+    'posts': (Post, (
+        'id', 'created', 'author_id', 'author__username', 'group_id',
+        'group__slug', 'text', 'image', 'comments_count',
+    )),
+    'comments': (Comment, (
+        'id', 'created', 'post_id', 'author_id', 'author__username', 'text',
+    )),
+    'follows': (Follow, ('id', 'user_id', 'author_id')),
+}
+DATED = ('posts', 'comments')
+GROUP_LOOKUPS = {
+    'posts': 'group__slug',
+    'comments': 'post__group__slug',
+}
+ENCODER = DjangoJSONEncoder(ensure_ascii=False)
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parse_moment(value):
+    """Дата или дата-время из параметра; дата означает начало дня."""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ExportError(f'Неверная дата: {value}')
+        moment = dt.datetime.combine(day, dt.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, timezone.utc)
+    return moment
+
+
+def queryset(kind, since=None, until=None, group=None, after=None):
+    """
+    values()-выборка для выгрузки в порядке id: since включительно,
+    until не включительно, after — последний уже выгруженный id.
+    """
+    if kind not in EXPORTS:
+        raise ExportError(f'Неизвестная выгрузка: {kind}')
+    model, fields = EXPORTS[kind]
+    rows = model.objects.order_by('pk')
+    if since or until:
+        if kind not in DATED:
+            raise ExportError(f'{kind}: фильтр по дате недоступен')
+        if since:
+            rows = rows.filter(created__gte=since)
+        if until:
+            rows = rows.filter(created__lt=until)
+    if group:
+        if kind not in GROUP_LOOKUPS:
+            raise ExportError(f'{kind}: фильтр по группе недоступен')
+        rows = rows.filter(**{GROUP_LOOKUPS[kind]: group})
+    if after is not None:
+        rows = rows.filter(pk__gt=after)
+    return rows.values(*fields)
+
+
+class _Line:
+    """Файлоподобный объект для csv.writer: возвращает строку, а не пишет."""
+
+    def write(self, value):
+        return value
+
+
+def lines(kind, rows, output_format='jsonl', header=True):
+    """
+    Строки выгрузки; CSV начинается с заголовка, если header не
+    выключен для продолжения уже начатого файла.
+    """
+    if output_format == 'jsonl':
+        for row in rows:
+            yield ENCODER.encode(row) + '\n'
+        return
+    writer = csv.writer(_Line())
+    fields = EXPORTS[kind][1]
+    if header:
+        yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([
+            value.isoformat() if isinstance(value, dt.datetime) else value
+            for value in (row[field] for field in fields)
+        ])
+
+
+def _buffered(chunks, size=64 * 1024):
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    yield b''.join(buffer)
+
+
+def _compressed(blocks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for block in blocks:
+        yield compressor.compress(block)
+    yield compressor.flush()
+
+
+def stream(kind, output_format='jsonl', compress=False,
+           chunk_size=CHUNK_SIZE, header=True, **filters):
+    """
+    Байты выгрузки блоками по 64 КБ. Строки читаются через
+    iterator(chunk_size), так что в памяти не бывает больше одной пачки;
+    gzip сжимает поток по ходу. Неверные параметры дают ExportError
+    сразу, до первого блока.
+    """
+    if output_format not in FORMATS:
+        raise ExportError(f'Неизвестный формат: {output_format}')
+    rows = queryset(kind, **filters).iterator(chunk_size=chunk_size)
+    blocks = _buffered(
+        line.encode()
+        for line in lines(kind, rows, output_format, header=header)
+    )
+    return _compressed(blocks) if compress else blocks
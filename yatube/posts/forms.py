@@ -1,16 +1,68 @@
 from django.forms import ModelForm
 from django import forms
+from django.core.files import File
+from django.core.files.uploadedfile import UploadedFile
+from django.db.models.fields.files import FieldFile
+from django.db import transaction
+from .images import normalize
 from .models import Post, Comment
 
 
-class PostForm(ModelForm):
+class RetryableSaveMixin:
+    """
+    save() можно повторить после отката транзакции
+    (core.db.serialized_write): новый объект вставляется заново, а не
+    обновляет строку, которой нет.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.creating = self.instance._state.adding
+
+    def save(self, commit=True):
+        if self.creating:
+            self.instance.pk = None
+            self.instance._state.adding = True
+        return super().save(commit)
+
+
+class PostForm(RetryableSaveMixin, ModelForm):
     class Meta:
         model = Post
         fields = ['text', 'group', 'image']
         labels = {'text': 'Введите текст', 'group': 'Выберите группу'}
         help_texts = {'text': 'Оставь любую надпись', 'group': 'существующие'}
 
-class CommentForm(forms.ModelForm):
+    def clean_image(self):
+        """Новая картинка нормализуется, её размеры пишутся в пост."""
+        image = self.cleaned_data.get('image')
+        post = self.instance
+        if post.image and image != post.image:
+            self.replaced_image = post.image.name
+        if isinstance(image, UploadedFile):
+            image, post.image_width, post.image_height = normalize(image)
+            post.image_size = image.size
+        elif not image:
+            post.image_width = post.image_height = post.image_size = None
+        return image
+
+    def save(self, commit=True):
+        """
+        Загруженная картинка при каждом вызове снова отдаётся хранилищу:
+        после отката ссылка на неё в MediaFile тоже откатилась.
+        Заменённая картинка освобождается после коммита.
+        """
+        image = self.cleaned_data.get('image')
+        if isinstance(image, File) and not isinstance(image, FieldFile):
+            self.instance.image = image
+        post = super().save(commit)
+        replaced = getattr(self, 'replaced_image', None)
+        if commit and replaced:
+            transaction.on_commit(
+                lambda: post.image.storage.delete(replaced))
+        return post
+
+class CommentForm(RetryableSaveMixin, forms.ModelForm):
     class Meta:
         model = Comment
         fields = ("text",)
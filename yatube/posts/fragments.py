@@ -0,0 +1,47 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+TEMPLATE = 'includes/content.html'
+
+
+def key(post, show_group=True):
+    """
+    Ключ фрагмента поста: id и отпечаток всего, что выводит шаблон.
+    Правка поста, новый комментарий, переименование автора или группы
+    дают новый ключ, так что сбрасывать фрагменты не нужно.
+    """
+    group = post.group if post.group_id else None
+    parts = (
+        post.text, post.created.isoformat(), post.image.name,
+        post.image_width, post.image_height,
+        post.comments_count, post.author.username, post.author.first_name,
+        post.author.last_name, group and group.slug, show_group,
+    )
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'post_fragment:{post.pk}:{digest}'
+
+
+def render_many(posts, group=None):
+    """
+    HTML постов страницы: все фрагменты берутся одним get_many,
+    рендерятся только промахи, и они же сохраняются одним set_many.
+    """
+    posts = list(posts)
+    show_group = group is None
+    keys = [key(post, show_group) for post in posts]
+    cached = cache.get_many(keys)
+    missing = {}
+    fragments = []
+    for post, post_key in zip(posts, keys):
+        fragment = cached.get(post_key)
+        if fragment is None:
+            fragment = render_to_string(
+                TEMPLATE, {'post': post, 'group': group})
+            missing[post_key] = fragment
+        fragments.append(fragment)
+    if missing:
+        cache.set_many(missing, settings.POST_FRAGMENT_TIMEOUT)
+    return fragments
@@ -0,0 +1,50 @@
+import time
+
+from django.core.cache import cache
+
+POSTS = 'posts'
+
+
+def _key(name):
+    return f'generation:{name}'
+
+
+def get(name=POSTS):
+    """
+    Текущее поколение данных для ключей кеша. Начальное значение берётся
+    из времени, чтобы после вытеснения ключа не вернуться к старым
+    фрагментам.
+    """
+    value = cache.get(_key(name))
+    if value is None:
+        cache.add(_key(name), int(time.time() * 1000), None)
+        value = cache.get(_key(name))
+    return value
+
+
+def bump(name=POSTS):
+    """
+    Время смены пишется после нового поколения: прочитавший поколение,
+    а затем время не получит время новее своего поколения.
+    """
+    try:
+        version = cache.incr(_key(name))
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(_key(name), version, None)
+    cache.set(f'{_key(name)}:changed', time.time(), None)
+    return version
+
+
+def changed(name=POSTS):
+    """Время последней смены поколения (для Last-Modified)."""
+    key = f'{_key(name)}:changed'
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, time.time(), None)
+        value = cache.get(key)
+    return value
+
+
+def feed(user_id):
+    return f'feed:{user_id}'
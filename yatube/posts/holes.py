@@ -0,0 +1,15 @@
+from core import holes
+from .forms import CommentForm
+from .models import Follow
+
+
+@holes.context('posts/includes/comment_form.html')
+def comment_form(request, post_id):
+    return {'form': CommentForm()}
+
+
+@holes.context('posts/includes/follow_button.html')
+def follow_button(request, author_id, username):
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author_id=author_id).exists()
+    return {'following': following}
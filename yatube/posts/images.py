@@ -0,0 +1,75 @@
+import io
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+def _save_options(image_format):
+    quality = settings.IMAGE_QUALITY
+    return {
+        'JPEG': {'quality': quality, 'optimize': True, 'progressive': True},
+        'WEBP': {'quality': quality, 'method': 4},
+        'PNG': {'optimize': True},
+        'GIF': {},
+    }[image_format]
+
+
+def _open(upload):
+    """
+    Открывает только заголовок и проверяет размер до декодирования:
+    бомба на миллиарды пикселей отклоняется, не заняв память.
+    """
+    if upload.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError('Файл картинки слишком большой')
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (Image.DecompressionBombError, OSError):
+        raise ValidationError('Не удалось прочитать картинку') from None
+    if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError('Слишком много пикселей в картинке')
+    return image
+
+
+def _target_format(image, source_format):
+    target = settings.IMAGE_FORMAT or source_format
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info)
+    if target not in EXTENSIONS:
+        target = 'PNG' if has_alpha else 'JPEG'
+    if target == 'JPEG' and has_alpha:
+        target = 'PNG'
+    return target
+
+
+def normalize(upload):
+    """
+    Приводит загруженную картинку к виду для хранения: поворот по EXIF,
+    длинная сторона не больше IMAGE_MAX_SIDE, перекодирование без
+    метаданных в исходный формат или IMAGE_FORMAT. Возвращает файл,
+    ширину и высоту. Анимированные картинки сохраняются как есть.
+    """
+    image = _open(upload)
+    if getattr(image, 'is_animated', False):
+        upload.seek(0)
+        return upload, image.width, image.height
+    source_format = image.format
+    side = settings.IMAGE_MAX_SIDE
+    # JPEG декодируется сразу в уменьшенном масштабе.
+    image.draft('RGB', (side, side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((side, side), Image.LANCZOS)
+    target = _target_format(image, source_format)
+    if target == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, target, **_save_options(target))
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    normalized = SimpleUploadedFile(
+        f'{stem}.{EXTENSIONS[target]}', buffer.getvalue(), Image.MIME[target])
+    return normalized, image.width, image.height
@@ -0,0 +1,284 @@
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post
+from .storage import add_references
+
+User = get_user_model()
+
+KINDS = ('users', 'groups', 'posts', 'comments', 'follows')
+MODELS = {
+    'users': User,
+    'groups': Group,
+    'posts': Post,
+    'comments': Comment,
+    'follows': Follow,
+}
+BULK_PRAGMAS = {
+    'synchronous': 'OFF',
+    'cache_size': '-262144',
+    'temp_store': 'MEMORY',
+}
+
+
+class LoadError(ValueError):
+    pass
+
+
+def source(directory, kind):
+    """Файл <kind>.jsonl или <kind>.csv в каталоге, если он есть."""
+    for extension in ('jsonl', 'csv'):
+        path = os.path.join(directory, f'{kind}.{extension}')
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def read(path):
+    """Построчно читает JSONL или CSV, не загружая файл целиком."""
+    with open(path, encoding='utf-8', newline='') as file:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(file)
+            return
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+@contextmanager
+def bulk_pragmas(conn=connection):
+    """
+    Настройки SQLite на время загрузки: без fsync на каждый коммит
+    и с большим кешем страниц. Прежние значения возвращаются. Внутри
+    транзакции SQLite их менять не даёт, тогда загрузка идёт как есть.
+    """
+    if conn.vendor != 'sqlite' or conn.in_atomic_block:
+        yield
+        return
+    with conn.cursor() as cursor:
+        previous = {}
+        for name, value in BULK_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}')
+            previous[name] = cursor.fetchone()[0]
+            cursor.execute(f'PRAGMA {name} = {value}')
+    try:
+        yield
+    finally:
+        with conn.cursor() as cursor:
+            for name, value in previous.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def reserve(model, count, conn=connection):
+    """
+    Резервирует count первичных ключей модели и возвращает ключ, после
+    которого они идут. В SQLite поднимается счётчик AUTOINCREMENT, так
+    что записи сайта во время загрузки получают ключи за диапазоном. В
+    других базах резерва нет, и сайт на время загрузки надо закрыть.
+    """
+    table = model._meta.db_table
+    top = model.objects.aggregate(top=Max('pk'))['top'] or 0
+    if conn.vendor != 'sqlite':
+        return top
+    with transaction.atomic(), conn.cursor() as cursor:
+        cursor.execute(
+            'UPDATE sqlite_sequence SET seq = MAX(seq, %s) + %s '
+            'WHERE name = %s', [top, count, table])
+        if not cursor.rowcount:
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                [table, top + count])
+        cursor.execute(
+            'SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+        return cursor.fetchone()[0] - count
+
+
+@contextmanager
+def explicit_created(*models):
+    """Даёт bulk_create сохранить created из файла вместо текущего времени."""
+    fields = [model._meta.get_field('created') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _created(row):
+    value = row.get('created')
+    if not value:
+        return timezone.now()
+    created = parse_datetime(value)
+    if created is None:
+        raise LoadError(f'Неверная дата: {value}')
+    if timezone.is_naive(created):
+        created = timezone.make_aware(created, timezone.utc)
+    return created
+
+
+class Loader:
+    """
+    Загружает выгрузку в порядке KINDS пачками bulk_create, каждая пачка
+    в своей транзакции. Первичные ключи выдаются подряд из диапазона,
+    зарезервированного при старте (reserve), так что id из файла
+    превращаются в ключи без запросов к базе. Начало диапазона и число
+    записанных строк хранятся в файле состояния: после сбоя повторный
+    запуск пропускает записанное. Если процесс упал между коммитом пачки
+    и записью состояния, число записанных строк восстанавливается по
+    ключам диапазона, а повторные подписки пропускаются уникальным
+    ограничением. Без резерва (не SQLite) сайт на время загрузки должен
+    быть закрыт: чужие строки в диапазоне останавливают загрузку.
+    """
+
+    def __init__(self, directory, batch_size=10000, state=None,
+                 log=print):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.state_path = state or os.path.join(
+            directory, '.load_yatube.json')
+        self.log = log
+        self.ids = {kind: {} for kind in KINDS}
+        self.state = {}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding='utf-8') as file:
+                self.state = json.load(file)
+
+    def save_state(self):
+        with open(self.state_path, 'w', encoding='utf-8') as file:
+            json.dump(self.state, file)
+
+    def ref(self, kind, value, required=True):
+        if value in (None, ''):
+            if required:
+                raise LoadError(f'Нет ссылки на {kind}')
+            return None
+        try:
+            return self.ids[kind][str(value)]
+        except KeyError:
+            raise LoadError(f'{kind}: нет записи с id {value}') from None
+
+    def build(self, kind, row, pk):
+        if kind == 'users':
+            return User(
+                pk=pk,
+                username=row['username'],
+                first_name=row.get('first_name') or '',
+                last_name=row.get('last_name') or '',
+                email=row.get('email') or '',
+                password=row.get('password') or '!',
+            )
+        if kind == 'groups':
+            return Group(
+                pk=pk,
+                slug=row['slug'],
+                title=row['title'],
+                description=row.get('description') or '',
+            )
+        if kind == 'posts':
+            return Post(
+                pk=pk,
+                text=row['text'],
+                author_id=self.ref('users', row.get('author')),
+                group_id=self.ref('groups', row.get('group'), False),
+                image=row.get('image') or '',
+                created=_created(row),
+            )
+        if kind == 'comments':
+            return Comment(
+                pk=pk,
+                text=row['text'],
+                post_id=self.ref('posts', row.get('post')),
+                author_id=self.ref('users', row.get('author')),
+                created=_created(row),
+            )
+        user_id = self.ref('users', row.get('user'))
+        author_id = self.ref('users', row.get('author'))
+        if user_id == author_id:
+            return None
+        return Follow(user_id=user_id, author_id=author_id)
+
+    def written(self, kind, offset, reserved):
+        """Строк вида kind, уже записанных в диапазон после offset."""
+        if kind == 'follows':
+            return 0
+        found = MODELS[kind].objects.filter(
+            pk__gt=offset, pk__lte=offset + reserved,
+        ).aggregate(top=Max('pk'), count=Count('pk'))
+        top = found['top'] or offset
+        if found['count'] != top - offset:
+            raise LoadError(
+                f'{kind}: в ключах после {offset} есть строки не из '
+                'загрузки, сайт во время загрузки должен быть закрыт')
+        return top - offset
+
+    def load_kind(self, kind, path):
+        model = MODELS[kind]
+        progress = self.state.setdefault(kind, {'done': 0})
+        if 'offset' not in progress:
+            progress['reserved'] = (
+                0 if kind == 'follows' else sum(1 for _ in read(path)))
+            progress['offset'] = reserve(model, progress['reserved'])
+            self.save_state()
+        offset = progress['offset']
+        done = max(
+            progress['done'],
+            self.written(kind, offset, progress['reserved']))
+        ids = self.ids[kind]
+        started = time.monotonic()
+        loaded = 0
+        batch = []
+        for index, row in enumerate(read(path)):
+            pk = offset + index + 1
+            if 'id' in row:
+                ids[str(row['id'])] = pk
+            if index < done:
+                continue
+            obj = self.build(kind, row, pk)
+            if obj is not None:
+                batch.append(obj)
+            if len(batch) >= self.batch_size:
+                loaded += self.flush(kind, batch, index + 1, started, loaded)
+                batch = []
+        if batch:
+            loaded += self.flush(kind, batch, index + 1, started, loaded)
+        return loaded
+
+    def flush(self, kind, batch, done, started, loaded):
+        """Пачка строк; done — сколько строк файла обработано с ней."""
+        with transaction.atomic():
+            MODELS[kind].objects.bulk_create(
+                batch, ignore_conflicts=kind == 'follows')
+            if kind == 'posts':
+                add_references(post.image.name for post in batch if post.image)
+        self.state[kind]['done'] = done
+        self.save_state()
+        total = loaded + len(batch)
+        rate = total / max(time.monotonic() - started, 1e-6)
+        self.log(
+            f'{kind}: {self.state[kind]["done"]} строк, {rate:.0f} строк/с')
+        return len(batch)
+
+    def run(self):
+        totals = {}
+        with bulk_pragmas(), explicit_created(Post, Comment):
+            for kind in KINDS:
+                path = source(self.directory, kind)
+                if path is not None:
+                    totals[kind] = self.load_kind(kind, path)
+        return totals
+
+    def finish(self):
+        """Загрузка завершена: состояние больше не нужно."""
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
@@ -0,0 +1,129 @@
+import datetime as dt
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.testing import temporary_cache
+from posts import benchmark
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Засевает отдельную базу данными заданного масштаба, прогоняет '
+        'все URL posts.urls через тестовый клиент и пишет замеры в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', choices=benchmark.SCALES, default='small',
+            help='Число постов: small — 10k, medium — 100k, large — 1M.',
+        )
+        parser.add_argument(
+            '--posts', type=int,
+            help='Точное число постов вместо --scale.',
+        )
+        parser.add_argument('--users', type=int)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Подписок на пользователя.',
+        )
+        parser.add_argument(
+            '--comments', type=int, default=2,
+            help='Комментариев на пост в среднем.',
+        )
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Не сбрасывать кеш между запросами.',
+        )
+        parser.add_argument(
+            '--database', default='benchmark.sqlite3',
+            help='Файл базы для прогона; с --keepdb засев переиспользуется.',
+        )
+        parser.add_argument('--keepdb', action='store_true')
+        parser.add_argument(
+            '--concurrency', action='store_true',
+            help='Сравнить голый и настроенный SQLite под параллельной '
+                 'нагрузкой читателей и писателей.',
+        )
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='Куда записать результаты.',
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON предыдущего прогона для отчёта о регрессиях.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=10.0,
+            help='Допустимый рост метрики, в процентах.',
+        )
+
+    def handle(self, *args, **options):
+        # Замеры сбрасывают кеш: общий файл воркеров не трогаем.
+        with temporary_cache():
+            self.measure(**options)
+
+    def measure(self, **options):
+        posts = options['posts'] or benchmark.SCALES[options['scale']]
+        connection.settings_dict['TEST']['NAME'] = options['database']
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False,
+            keepdb=options['keepdb'],
+        )
+        try:
+            if not Post.objects.exists():
+                benchmark.seed(
+                    posts,
+                    users=options['users'],
+                    groups=options['groups'],
+                    follows=options['follows'],
+                    comments=options['comments'],
+                    log=self.stdout.write,
+                    stdout=self.stdout,
+                )
+            views = benchmark.run(
+                options['iterations'], options['warm'], log=self.stdout.write)
+            throughput = benchmark.throughput()
+            for name, metrics in throughput.items():
+                self.stdout.write(f'{name:20} {metrics}')
+            concurrency = None
+            if options['concurrency']:
+                concurrency = benchmark.concurrency(
+                    options['readers'], options['writers'],
+                    options['seconds'])
+                for name, roles in concurrency.items():
+                    self.stdout.write(f'{name:20} {roles}')
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb'])
+        result = {
+            'meta': {
+                'created': dt.datetime.now().isoformat(timespec='seconds'),
+                'posts': posts,
+                'iterations': options['iterations'],
+                'warm': options['warm'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'views': views,
+            'throughput': throughput,
+        }
+        if concurrency:
+            result['concurrency'] = concurrency
+        benchmark.dump(options['output'], result)
+        self.stdout.write(f'Результаты записаны в {options["output"]}')
+        if not options['compare']:
+            return
+        lines, regressions = benchmark.compare(
+            benchmark.load(options['compare']), result, options['threshold'])
+        self.stdout.write('\n'.join(lines))
+        if regressions:
+            raise CommandError(f'Регрессий: {len(regressions)}')
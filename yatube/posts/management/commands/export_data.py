@@ -0,0 +1,60 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import (
+    CHUNK_SIZE, EXPORTS, FORMATS, ExportError, parse_moment, stream,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает посты, комментарии или подписки в JSONL или CSV '
+        'без загрузки таблицы в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=EXPORTS)
+        parser.add_argument(
+            '--output', '-o',
+            help='Файл выгрузки; .gz включает сжатие. По умолчанию stdout.',
+        )
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--since', help='Дата создания, включительно.')
+        parser.add_argument('--until', help='Дата создания, не включительно.')
+        parser.add_argument('--group', help='Slug группы.')
+        parser.add_argument(
+            '--after', type=int,
+            help='Продолжить после этого id (последнего выгруженного).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, kind, output, **options):
+        compress = options['gzip'] or bool(output and output.endswith('.gz'))
+        # При --after выгрузка продолжает прерванную: файл дописывается,
+        # и заголовок CSV в нём уже есть.
+        resume = options['after'] is not None
+        try:
+            chunks = stream(
+                kind,
+                output_format=options['format'],
+                compress=compress,
+                chunk_size=options['chunk_size'],
+                since=parse_moment(options['since']),
+                until=parse_moment(options['until']),
+                group=options['group'],
+                after=options['after'],
+                header=not resume,
+            )
+        except ExportError as error:
+            raise CommandError(error)
+        if output is None:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+        with open(output, 'ab' if resume else 'wb') as file:
+            for chunk in chunks:
+                file.write(chunk)
+        self.stderr.write(f'Выгрузка записана в {output}')
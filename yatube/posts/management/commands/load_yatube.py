@@ -0,0 +1,56 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from posts import generation
+from posts.counters import recount
+from posts.loader import KINDS, Loader, LoadError
+from posts.timeline import forget_popular_authors
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает пользователей, группы, посты, комментарии и подписки '
+        'из файлов <вид>.jsonl или <вид>.csv в каталоге. Прерванную '
+        'загрузку можно продолжить повторным запуском. Ключи новых '
+        'строк резервируются заранее (SQLite); на других базах сайт на '
+        'время загрузки надо закрыть.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'directory',
+            help=f'Каталог с файлами: {", ".join(KINDS)}.',
+        )
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--state',
+            help='Файл состояния; по умолчанию .load_yatube.json в каталоге.',
+        )
+
+    def handle(self, *args, directory, batch_size, state, **options):
+        loader = Loader(
+            directory, batch_size, state, log=self.stdout.write)
+        started = time.monotonic()
+        try:
+            totals = loader.run()
+        except (LoadError, KeyError, IntegrityError) as error:
+            raise CommandError(
+                f'Загрузка остановлена: {error}. Исправьте файл и '
+                'запустите команду снова, записанное не повторится.'
+            )
+        self.stdout.write('Счётчики и ленты')
+        with transaction.atomic():
+            recount()
+        forget_popular_authors()
+        call_command('rebuild_timelines', stdout=self.stdout)
+        generation.bump()
+        loader.finish()
+        rows = sum(totals.values())
+        seconds = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {rows} строк за {seconds:.1f} с '
+            f'({rows / max(seconds, 1e-6):.0f} строк/с)'
+        ))
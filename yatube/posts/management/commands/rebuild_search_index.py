@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает полнотекстовый индекс постов (FTS5).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, database, **options):
+        conn = connections[database]
+        search.install(conn)
+        search.rebuild(conn)
+        self.stdout.write('Поисковый индекс пересобран')
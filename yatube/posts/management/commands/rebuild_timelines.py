@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from posts.models import Follow, TimelineEntry
+from posts.timeline import fill, popular_authors
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает ленты подписок (TimelineEntry) из Follow и Post: '
+        'по одному INSERT … SELECT и короткой транзакции на автора.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='usernames', default=[],
+            help='Пересобрать ленту только этого пользователя.',
+        )
+
+    def handle(self, *args, usernames, **options):
+        popular = popular_authors()
+        follows = Follow.objects.exclude(author__in=popular)
+        entries = TimelineEntry.objects.all()
+        user_ids = None
+        if usernames:
+            user_ids = list(
+                User.objects.filter(username__in=usernames)
+                .values_list('pk', flat=True))
+            follows = follows.filter(user__in=user_ids)
+            entries = entries.filter(user__in=user_ids)
+        authors = (
+            follows.order_by().values_list('author_id', flat=True).distinct())
+        total = 0
+        for author_id in authors.iterator():
+            with transaction.atomic():
+                entries.filter(author_id=author_id).delete()
+                total += fill(author_id, user_ids=user_ids)
+        # Записи без подписки и посты популярных авторов лентам не нужны.
+        stale = entries.annotate(followed=Exists(Follow.objects.filter(
+            user=OuterRef('user'), author=OuterRef('author'),
+        ))).filter(followed=False)
+        entries.filter(author__in=popular).delete()
+        TimelineEntry.objects.filter(pk__in=stale.values('pk')).delete()
+        self.stdout.write(f'Записей в лентах: {total}')
@@ -0,0 +1,75 @@
+import os
+import shutil
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from posts import generation
+from posts.models import MediaFile, Post
+from posts.storage import content_name, digest, is_content_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов из плоского posts/ в хранилище по '
+        'содержимому: одинаковые файлы сливаются в один, посты получают '
+        'новые имена, число ссылок записывается в MediaFile.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет перенесено.',
+        )
+
+    def handle(self, *args, dry_run, **options):
+        storage = Post._meta.get_field('image').storage
+        names = list(
+            Post.objects.exclude(image='').order_by()
+            .values_list('image', flat=True).distinct()
+        )
+        moved = merged = missing = 0
+        for name in names:
+            if is_content_name(name):
+                continue
+            if not storage.exists(name):
+                missing += 1
+                self.stderr.write(f'Нет файла {name}')
+                continue
+            with storage.open(name) as source:
+                target = content_name(name, digest(source))
+            duplicate = storage.exists(target)
+            merged += duplicate
+            moved += not duplicate
+            if dry_run:
+                self.stdout.write(f'{name} -> {target}')
+                continue
+            self.move(storage, name, target, duplicate)
+        if not dry_run and (moved or merged):
+            generation.bump()
+        self.stdout.write(
+            f'Перенесено: {moved}, слито с уже сохранёнными: {merged}, '
+            f'без файла: {missing}')
+
+    def move(self, storage, name, target, duplicate):
+        """
+        Файл сначала появляется под новым именем, затем посты
+        переключаются на него, и только потом удаляется старый: прерванный
+        перенос не оставляет постов без картинки.
+        """
+        source, destination = storage.path(name), storage.path(target)
+        if not duplicate:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            try:
+                os.link(source, destination)
+            except OSError:
+                shutil.copy2(source, destination)
+        with transaction.atomic():
+            count = Post.objects.filter(image=name).update(image=target)
+            _, created = MediaFile.objects.get_or_create(
+                name=target, defaults={'references': count})
+            if not created:
+                MediaFile.objects.filter(name=target).update(
+                    references=F('references') + count)
+        os.remove(source)
@@ -0,0 +1,43 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_post
+
+# Сколько постов на поток может ждать в очереди пула.
+PENDING_PER_WORKER = 4
+
+
+class Command(BaseCommand):
+    help = 'Заранее создаёт миниатюры всех картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS)
+
+    def handle(self, *args, workers, **options):
+        posts = Post.objects.exclude(image='').values_list('pk', flat=True)
+        started = time.monotonic()
+        self.done = 0
+        pending = set()
+        with ThreadPoolExecutor(workers) as pool:
+            for pk in posts.iterator():
+                if len(pending) >= workers * PENDING_PER_WORKER:
+                    finished, pending = wait(
+                        pending, return_when=FIRST_COMPLETED)
+                    self.report(finished)
+                pending.add(pool.submit(generate_post, pk))
+            self.report(wait(pending).done)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'Готово: {self.done} постов за {elapsed:.1f} с')
+
+    def report(self, finished):
+        for future in finished:
+            future.result()
+            self.done += 1
+            if self.done % 100 == 0:
+                self.stdout.write(f'Обработано постов: {self.done}')
@@ -0,0 +1,93 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:34
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import (
+    Count, F, IntegerField, Min, OuterRef, Subquery,
+)
+from django.db.models.functions import Coalesce
+import django.db.models.expressions
+
+
+def count(model, field):
+    rows = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def recount(apps, schema_editor):
+    """Пересчитывает счётчики по исходным таблицам."""
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    missing = User.objects.exclude(
+        pk__in=UserStats.objects.values('user')).values_list('pk', flat=True)
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in missing], ignore_conflicts=True)
+    UserStats.objects.update(
+        posts_count=count(Post, 'author'),
+        followers_count=count(Follow, 'author'),
+        following_count=count(Follow, 'user'),
+    )
+    apps.get_model('posts', 'Group').objects.update(
+        posts_count=count(Post, 'group'))
+    Post.objects.update(comments_count=count(Comment, 'post'))
+
+
+def drop_bad_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    deleted, _ = Follow.objects.filter(user=F('author')).delete()
+    keep = (
+        Follow.objects.values('user', 'author')
+        .annotate(first=Min('id'))
+        .values_list('first', flat=True)
+    )
+    deleted += Follow.objects.exclude(id__in=list(keep)).delete()[0]
+    if deleted:
+        recount(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_bad_follows, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='follow',
+            options={'verbose_name': 'Подписка', 'verbose_name_plural': 'Подписки'},
+        ),
+        migrations.AlterModelOptions(
+            name='post',
+            options={'ordering': ['-created', '-id'], 'verbose_name': 'Пост', 'verbose_name_plural': 'Посты'},
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-created', '-id'], name='post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-created', '-id'], name='post_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-created', '-id'], name='post_group_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(_negated=True, user=django.db.models.expressions.F('author')), name='no_self_follow'),
+        ),
+    ]
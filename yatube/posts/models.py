@@ -2,6 +2,7 @@ from tkinter import CASCADE
 from django.db import models
 from django.contrib.auth import get_user_model
 from core.models import CreatedModel
+from .storage import post_images
 
 User = get_user_model()
 
@@ -12,6 +13,7 @@ class Group(models.Model):
         unique=True,
     )
     description = models.TextField()
+    posts_count = models.PositiveIntegerField('Постов', default=0)
 
     def __str__(self):
         return self.title
@@ -34,18 +36,50 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=post_images,
         blank=True
     )  
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', null=True, blank=True, editable=False)
+    image_size = models.PositiveIntegerField(
+        'Размер картинки, байт', null=True, blank=True, editable=False)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
 
     class Meta:
-        ordering = ['-created']
+        ordering = ['-created', '-id']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['-created', '-id'],
+                name='post_created_idx',
+            ),
+            models.Index(
+                fields=['author', '-created', '-id'],
+                name='post_author_created_idx',
+            ),
+            models.Index(
+                fields=['group', '-created', '-id'],
+                name='post_group_created_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
-class Comment(models.Model):
+
+class MediaFile(models.Model):
+    """Число постов, ссылающихся на файл ContentAddressedStorage."""
+    name = models.CharField(max_length=255, primary_key=True)
+    references = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
+
+
+class Comment(CreatedModel):
     post = models.ForeignKey(
         Post, on_delete=models.CASCADE,
         related_name="comments", verbose_name="Пост комментария"
@@ -56,6 +90,15 @@ class Comment(models.Model):
     )
     text = models.TextField(verbose_name="Текст комментария")
 
+    class Meta:
+        ordering = ['created', 'id']
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.text
 
@@ -73,4 +116,73 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Автор',
         help_text='Это автор',
-    )
\ No newline at end of file
+    )
+
+    class Meta:
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow',
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='no_self_follow',
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые поддерживаются при записи."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписчика, разложенный при публикации (fan-out)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста',
+    )
+    created = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-created', '-post'],
+                name='timeline_user_created_idx',
+            ),
+        ]
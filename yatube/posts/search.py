@@ -0,0 +1,189 @@
+import json
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.utils.safestring import mark_safe
+
+from core.paginator import NEXT, PREVIOUS, CursorPage, InvalidCursor
+from .models import Post
+
+TABLE = 'posts_post_fts'
+TRIGGERS = {
+    'posts_post_fts_insert': (
+        'AFTER INSERT ON posts_post BEGIN '
+        'INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); '
+        'END'
+    ),
+    'posts_post_fts_delete': (
+        'AFTER DELETE ON posts_post BEGIN '
+        "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+        "VALUES ('delete', old.id, old.text); "
+        'END'
+    ),
+    'posts_post_fts_update': (
+        'AFTER UPDATE OF text ON posts_post BEGIN '
+        "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+        "VALUES ('delete', old.id, old.text); "
+        'INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); '
+        'END'
+    ),
+}
+# Маркеры подсветки, которых не бывает в тексте: текст экранируется,
+# а затем маркеры заменяются на <mark>.
+MARK_START = '\x02'
+MARK_END = '\x03'
+SNIPPET_TOKENS = 24
+
+SEARCH_SQL = '''
+SELECT id, score, snippet FROM (
+    SELECT p.id AS id,
+           bm25(posts_post_fts) AS score,
+           snippet(posts_post_fts, 0, %s, %s, '…', %s) AS snippet
+    FROM posts_post_fts
+    INNER JOIN posts_post p ON p.id = posts_post_fts.rowid
+    WHERE posts_post_fts MATCH %s{filters}
+){keyset}
+ORDER BY score {order}, id {order}
+LIMIT %s
+'''
+
+
+def install(conn=connection):
+    """
+    Создаёт FTS5-таблицу и триггеры, если их нет. SQLite теряет триггеры
+    при пересоздании posts_post в миграциях, поэтому вызывается и после
+    каждого migrate; если что-то пришлось создать, индекс пересобирается.
+    """
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type IN ('table', 'trigger') AND name LIKE %s",
+            [f'{TABLE}%'],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = ({TABLE} | set(TRIGGERS)) - existing
+        if TABLE in missing:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE {TABLE} USING fts5('
+                "text, content='posts_post', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+        for name, body in TRIGGERS.items():
+            if name in missing:
+                cursor.execute(f'CREATE TRIGGER {name} {body}')
+    if missing:
+        rebuild(conn)
+
+
+def rebuild(conn=connection):
+    with conn.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(query):
+    """Слова запроса в кавычках: синтаксис FTS5 пользователю недоступен."""
+    words = re.findall(r'\w+', query)
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def matching_ids(query):
+    """Подзапрос id найденных постов, например для поиска в админке."""
+    return (
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+        [match_expression(query)],
+    )
+
+
+class SearchPaginator:
+    """
+    Курсорная пагинация выдачи, отсортированной по bm25: курсор хранит
+    (score, id) последней записи страницы.
+    """
+
+    def __init__(self, query, per_page, group=None, author=None):
+        self.query = match_expression(query)
+        self.per_page = per_page
+        self.group = group
+        self.author = author
+
+    def encode_cursor(self, post, direction):
+        payload = json.dumps([direction, [post.score, post.pk]])
+        return urlsafe_base64_encode(payload.encode())
+
+    def decode_cursor(self, cursor):
+        try:
+            direction, (score, pk) = json.loads(
+                urlsafe_base64_decode(cursor).decode())
+            if direction not in (NEXT, PREVIOUS):
+                raise InvalidCursor(cursor)
+            return direction, (float(score), int(pk))
+        except (TypeError, ValueError, UnicodeDecodeError) as error:
+            raise InvalidCursor(cursor) from error
+
+    def _rows(self, values, reverse):
+        filters, params = '', []
+        if self.group is not None:
+            filters += ' AND p.group_id = %s'
+            params.append(self.group.pk)
+        if self.author is not None:
+            filters += ' AND p.author_id = %s'
+            params.append(self.author.pk)
+        keyset = ''
+        if values is not None:
+            sign = '<' if reverse else '>'
+            keyset = (
+                f'\nWHERE score {sign} %s OR (score = %s AND id {sign} %s)'
+            )
+            params += [values[0], values[0], values[1]]
+        sql = SEARCH_SQL.format(
+            filters=filters,
+            keyset=keyset,
+            order='DESC' if reverse else 'ASC',
+        )
+        params = [
+            MARK_START, MARK_END, SNIPPET_TOKENS, self.query,
+        ] + params + [self.per_page + 1]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def cursor_page(self, cursor=None):
+        direction, values = NEXT, None
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+        reverse = direction == PREVIOUS
+        rows = self._rows(values, reverse) if self.query else []
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [pk for pk, _, _ in rows])
+        items = []
+        for pk, score, snippet in rows:
+            post = posts.get(pk)
+            if post is None:
+                continue
+            post.score = score
+            post.snippet = highlight(snippet)
+            items.append(post)
+        if reverse:
+            items.reverse()
+            return CursorPage(items, self, True, has_more)
+        return CursorPage(items, self, has_more, values is not None)
+
+    def get_cursor_page(self, cursor=None):
+        try:
+            return self.cursor_page(cursor)
+        except InvalidCursor:
+            return self.cursor_page()
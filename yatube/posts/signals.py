@@ -0,0 +1,93 @@
+from functools import partial
+
+from django.db import connections, transaction
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_save,
+)
+from django.dispatch import receiver
+
+from . import counters, generation, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+# Поля пользователя, которые видны в ленте постов.
+RENDERED_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    if instance.image:
+        transaction.on_commit(partial(
+            instance.image.storage.delete, instance.image.name))
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.add_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_timeline(sender, instance, **kwargs):
+    timeline.remove_author(instance.user_id, instance.author_id)
+
+
+def remember_counted(sender, instance, raw=False, **kwargs):
+    if instance.pk is not None and not raw:
+        counters.remember(instance)
+
+
+def update_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.count_created(instance)
+    else:
+        counters.count_changed(instance)
+
+
+def decrease_counters(sender, instance, **kwargs):
+    counters.count_deleted(instance)
+
+
+for model in counters.COUNTED:
+    pre_save.connect(remember_counted, sender=model)
+    post_save.connect(update_counters, sender=model)
+    post_delete.connect(decrease_counters, sender=model)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_posts_generation(sender, **kwargs):
+    transaction.on_commit(generation.bump)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_for_user(sender, update_fields=None, **kwargs):
+    if update_fields is None or RENDERED_USER_FIELDS & set(update_fields):
+        transaction.on_commit(generation.bump)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_feed_generation(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        generation.bump, generation.feed(instance.user_id)))
+    # Счётчики подписок видны на профилях.
+    transaction.on_commit(generation.bump)
+
+
+@receiver(post_migrate)
+def install_search(sender, using='default', **kwargs):
+    if sender.name == 'posts':
+        search.install(connections[using])
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import posixpath
+from collections import Counter
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+CHUNK_SIZE = 64 * 1024
+# Уровни вложенности и длина имени каталога: posts/ab/cd/abcd....jpg.
+SHARD_DEPTH = 2
+SHARD_WIDTH = 2
+
+
+def digest(content):
+    content.seek(0)
+    hasher = hashlib.sha256()
+    for chunk in iter(lambda: content.read(CHUNK_SIZE), b''):
+        hasher.update(chunk)
+    content.seek(0)
+    return hasher.hexdigest()
+
+
+def content_name(name, hexdigest):
+    """Имя по содержимому в каталоге исходного имени, с его расширением."""
+    directory = posixpath.dirname(name)
+    extension = os.path.splitext(name)[1].lower()
+    shards = [
+        hexdigest[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH]
+        for level in range(SHARD_DEPTH)
+    ]
+    return posixpath.join(directory, *shards, hexdigest + extension)
+
+
+def is_content_name(name):
+    stem = os.path.splitext(posixpath.basename(name))[0]
+    return len(stem) == 64 and set(stem) <= set('0123456789abcdef')
+
+
+def add_references(names):
+    """
+    Учитывает в MediaFile ссылки на файлы, записанные в базу мимо
+    storage.save(), например при массовой загрузке: иначе delete()
+    первой же ссылки удалил бы файл, нужный остальным.
+    """
+    from .models import MediaFile
+
+    counts = Counter(names)
+    existing = set(MediaFile.objects.filter(
+        name__in=counts).values_list('name', flat=True))
+    MediaFile.objects.bulk_create(
+        MediaFile(name=name, references=count)
+        for name, count in counts.items() if name not in existing
+    )
+    by_count = {}
+    for name in existing:
+        by_count.setdefault(counts[name], []).append(name)
+    for count, names in by_count.items():
+        MediaFile.objects.filter(name__in=names).update(
+            references=F('references') + count)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файлы называются по SHA-256 содержимого и раскладываются по
+    вложенным каталогам. Одинаковые загрузки хранятся один раз; число
+    ссылок на файл ведёт MediaFile, и delete() удаляет файл только
+    вместе с последней ссылкой.
+    """
+
+    def save(self, name, content, max_length=None):
+        from .models import MediaFile
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = content_name(name, digest(content))
+        _, created = MediaFile.objects.get_or_create(name=name)
+        if not created:
+            MediaFile.objects.filter(name=name).update(
+                references=F('references') + 1)
+        if self.exists(name):
+            return name
+        return self._save(name, content)
+
+    def get_available_name(self, name, max_length=None):
+        """
+        Имя задаёт содержимое, суффиксов не бывает: файл, записанный
+        параллельной загрузкой, уже тот самый.
+        """
+        if self.exists(name):
+            raise FileExistsError(name)
+        return name
+
+    def _save(self, name, content):
+        try:
+            return super()._save(name, content)
+        except FileExistsError:
+            return name
+
+    def delete(self, name):
+        """
+        Счётчик и файл меняются в одной транзакции: загрузка того же
+        содержимого не потеряет файл между уменьшением и удалением.
+        """
+        from .models import MediaFile
+
+        files = MediaFile.objects.filter(name=name)
+        with transaction.atomic():
+            while True:
+                released = files.filter(references__gt=1).update(
+                    references=F('references') - 1)
+                if released:
+                    return
+                deleted, _ = files.filter(references__lte=1).delete()
+                if deleted or not files.exists():
+                    break
+            if deleted or not is_content_name(name):
+                super().delete(name)
+
+
+post_images = ContentAddressedStorage()
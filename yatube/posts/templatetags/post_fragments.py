@@ -0,0 +1,15 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.fragments import render_many
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_fragments(context, posts):
+    """HTML постов страницы из кеша фрагментов, в порядке posts."""
+    return [
+        mark_safe(fragment)
+        for fragment in render_many(posts, context.get('group'))
+    ]
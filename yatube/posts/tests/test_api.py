@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Опис')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Пост {i}',
+                group=cls.group if i % 2 else None)
+            for i in range(5)
+        ]
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.posts[0], author=cls.reader, text=f'Коммент {i}')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(f'posts:{name}', args=args), params)
+
+    def test_posts_cursor_pages(self):
+        """Посты идут страницами по курсору, новые первыми."""
+        data = self.get('api_posts', limit=3).json()
+        self.assertEqual(
+            [row['id'] for row in data['results']],
+            [post.pk for post in self.posts[:1:-1]],
+        )
+        self.assertIsNone(data['previous'])
+        data = self.client.get(data['next']).json()
+        self.assertEqual(
+            [row['id'] for row in data['results']],
+            [self.posts[1].pk, self.posts[0].pk],
+        )
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+
+    def test_sparse_fields(self):
+        data = self.get('api_posts', fields='text,group', group='test-slug')
+        rows = data.json()['results']
+        self.assertEqual(rows[0], {'text': 'Пост 3', 'group': 'test-slug'})
+        self.assertEqual(len(rows), 2)
+        response = self.get('api_posts', fields='text,password')
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag(self):
+        """Повтор с If-None-Match получает 304, изменение — новый ETag."""
+        url = reverse('posts:api_groups')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Group.objects.create(title='Новая', slug='new', description='')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_profile_and_comments(self):
+        data = self.get('api_profile', 'auth').json()
+        self.assertEqual(data['posts_count'], 5)
+        self.assertEqual(data['followers_count'], 1)
+        self.assertEqual(self.get('api_profile', 'nobody').status_code, 404)
+        data = self.get(
+            'api_comments', self.posts[0].pk, fields='text,author').json()
+        self.assertEqual(data['results'][0],
+                         {'text': 'Коммент 0', 'author': 'reader'})
+        self.assertEqual(self.get('api_comments', 999).status_code, 404)
+
+    def test_follow_feed(self):
+        self.assertEqual(self.get('api_follow').status_code, 401)
+        self.client.force_login(ApiTest.reader)
+        data = self.get('api_follow', limit=4, fields='id').json()
+        self.assertEqual(
+            data['results'],
+            [{'id': post.pk} for post in self.posts[:0:-1]],
+        )
+        data = self.client.get(data['next']).json()
+        self.assertEqual(data['results'], [{'id': self.posts[0].pk}])
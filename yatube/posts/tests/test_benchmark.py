@@ -0,0 +1,65 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts import benchmark, urls
+from posts.models import Comment, Follow, Post, TimelineEntry
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_and_run(self):
+        """Засев заполняет базу, прогон покрывает каждый URL posts.urls."""
+        benchmark.seed(
+            200, groups=3, follows=3, log=lambda message: None,
+            stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 400)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        posts = Post.objects.count()
+        results = benchmark.run(2, log=lambda message: None)
+        self.assertEqual(len(results), len(urls.urlpatterns))
+        for name in (*benchmark.FORMS, 'profile_follow', 'profile_unfollow'):
+            with self.subTest(name=name):
+                self.assertEqual(results[name]['status'], 302)
+        self.assertEqual(Post.objects.count(), posts + 3)
+        self.assertEqual(
+            Post.objects.filter(text=benchmark.FORMS['post_edit']['text'])
+            .count(), 1)
+        for name, metrics in results.items():
+            with self.subTest(name=name):
+                self.assertLess(metrics['status'], 400)
+                self.assertGreater(metrics['queries'], 0)
+                self.assertGreaterEqual(metrics['p99_ms'], metrics['p50_ms'])
+        self.assertGreater(results['index']['render_ms'], 0)
+        throughput = benchmark.throughput(limit=50, repeat=1)
+        self.assertEqual(throughput['api_values']['rows'], 50)
+        self.assertGreater(throughput['api_models']['rows_per_second'], 0)
+
+    def test_compare(self):
+        """Регрессией считается рост метрики больше порога."""
+        baseline = {'views': {'index': {'p50_ms': 10.0, 'queries': 3}}}
+        baseline['throughput'] = {'api_values': {'rows_per_second': 1000}}
+        current = {
+            'views': {
+                'index': {'p50_ms': 10.5, 'queries': 4},
+                'search': {'p50_ms': 1.0},
+            },
+            'throughput': {'api_values': {'rows_per_second': 800}},
+        }
+        lines, regressions = benchmark.compare(baseline, current, 10)
+        self.assertEqual(
+            [regression[:2] for regression in regressions],
+            [('index', 'queries'), ('api_values', 'rows_per_second')],
+        )
+        self.assertIn('search: нет в базовом прогоне', lines)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 0.5), 50)
+        self.assertEqual(benchmark.percentile(values, 0.99), 99)
+        self.assertEqual(benchmark.percentile([7], 0.95), 7)
@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import cache as backend
+from core.cache import SQLiteCache
+
+
+def _increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = self.create()
+
+    def create(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_shared_between_instances(self):
+        """Запись одного экземпляра видна другому на том же файле."""
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.create().get('key'), {'value': [1, 2]})
+        self.create().delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_ttl(self):
+        self.cache.set('short', 1, timeout=1)
+        self.cache.set('forever', 2, timeout=None)
+        self.assertFalse(self.cache.add('short', 3))
+        with mock.patch('time.time', return_value=time.time() + 2):
+            self.assertIsNone(self.cache.get('short'))
+            self.assertFalse(self.cache.touch('short'))
+            self.assertEqual(self.cache.get('forever'), 2)
+            self.assertTrue(self.cache.add('short', 3))
+        self.assertEqual(self.cache.get('short'), 3)
+
+    def test_many(self):
+        self.cache.set_many({'a': 1, 'b': 'два', 'c': None})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c', 'd']),
+            {'a': 1, 'b': 'два', 'c': None},
+        )
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'c': None})
+
+    def test_lru_cull(self):
+        """При переполнении вытесняются давно не читавшиеся ключи."""
+        cache = self.create(MAX_ENTRIES=10, CULL_FREQUENCY=2)
+        with mock.patch.object(backend, 'CULL_EVERY', 1):
+            now = time.time()
+            for index in range(10):
+                with mock.patch('time.time', return_value=now + index):
+                    cache.set(index, index)
+            with mock.patch('time.time', return_value=now + 20):
+                cache.get(0)
+                cache.set('new', 'new')
+        found = cache.get_many(list(range(10)) + ['new'])
+        self.assertEqual(sorted(found, key=str), [0, 6, 7, 8, 9, 'new'])
+
+    def test_incr_across_processes(self):
+        """incr атомарен: из параллельных процессов не теряется ни один."""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_increment, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+        self.assertEqual(self.cache.decr('counter', 10), 190)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
@@ -0,0 +1,116 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.db import serialized_write
+from posts.forms import PostForm
+from posts.models import Group, MediaFile, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(
+    DB_WRITE_RETRIES=2, DB_WRITE_RETRY_DELAY=0, MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SerializedWriteTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def flaky(self, failures, message='database is locked'):
+        calls = []
+
+        @serialized_write
+        def view():
+            calls.append(connection.in_atomic_block)
+            Group.objects.create(
+                title='Группа', slug=f'slug-{len(calls)}', description='')
+            if len(calls) <= failures:
+                raise OperationalError(message)
+            return 'ok'
+
+        return view, calls
+
+    def test_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    def test_retry_when_locked(self):
+        """Заблокированная запись повторяется, откатив неудачную попытку."""
+        view, calls = self.flaky(2)
+        self.assertEqual(view(), 'ok')
+        self.assertEqual(calls, [True, True, True])
+        self.assertEqual(
+            list(Group.objects.values_list('slug', flat=True)), ['slug-3'])
+
+    def test_gives_up(self):
+        view, calls = self.flaky(3)
+        with self.assertRaises(OperationalError):
+            view()
+        self.assertEqual(len(calls), 3)
+        self.assertFalse(Group.objects.exists())
+
+    def test_other_errors_not_retried(self):
+        view, calls = self.flaky(1, 'no such table')
+        with self.assertRaises(OperationalError):
+            view()
+        self.assertEqual(len(calls), 1)
+
+    def test_no_retry_inside_transaction(self):
+        view, calls = self.flaky(1)
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                view()
+        self.assertEqual(len(calls), 1)
+
+    def test_form_save_retried(self):
+        """Повтор сохранения формы не теряет ни пост, ни картинку."""
+        form = PostForm({'text': 'Пост'}, {'image': SimpleUploadedFile(
+            'small.gif', SMALL_GIF, content_type='image/gif')})
+        self.assertTrue(form.is_valid())
+        form.instance.author = User.objects.create_user(username='auth')
+        calls = []
+
+        @serialized_write
+        def save():
+            post = form.save()
+            calls.append(post.pk)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return post
+
+        post = save()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(Post.objects.get().pk, post.pk)
+        self.assertEqual(
+            MediaFile.objects.get(name=post.image.name).references, 1)
+        self.assertGreater(post.image_size, 0)
+        self.assertEqual(post.image.size, post.image_size)
+
+    def test_lock_only_for_writes(self):
+        """Показ формы не берёт блокировку записи."""
+        client = Client()
+        client.force_login(User.objects.create_user(username='auth'))
+        with mock.patch('core.db._write_lock') as lock:
+            response = client.get(reverse('posts:post_create'))
+            self.assertEqual(response.status_code, 200)
+            lock.__enter__.assert_not_called()
+            client.post(reverse('posts:post_create'), {'text': 'Пост'})
+            lock.__enter__.assert_called_once()
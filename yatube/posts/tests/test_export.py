@@ -0,0 +1,125 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user,
+                text=f'Пост {i}',
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[1], author=cls.user, text='Коммент')
+        Post.objects.filter(pk=cls.posts[0].pk).update(
+            created='2000-01-01T00:00:00Z')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.staff_client = Client()
+        self.staff_client.force_login(ExportTest.staff)
+
+    def export(self, *args, **options):
+        path = os.path.join(self.directory, 'posts.jsonl')
+        call_command(
+            'export_data', *args, output=path, stderr=StringIO(), **options)
+        with open(path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_command_filters(self):
+        """Фильтры по группе, дате и продолжение после id."""
+        rows = self.export('posts')
+        self.assertEqual(
+            [row['id'] for row in rows], [post.pk for post in self.posts])
+        self.assertEqual(rows[1]['group__slug'], 'test-slug')
+        rows = self.export('posts', group='test-slug')
+        self.assertEqual(len(rows), 2)
+        rows = self.export('posts', since='2010-01-01')
+        self.assertEqual(len(rows), 4)
+        rows = self.export('posts', until='2010-01-01')
+        self.assertEqual(rows[0]['id'], self.posts[0].pk)
+        self.assertEqual(len(rows), 1)
+        rows = self.export('comments', group='test-slug')
+        self.assertEqual(rows[0]['text'], 'Коммент')
+
+    def test_command_resume_appends(self):
+        path = os.path.join(self.directory, 'posts.jsonl')
+        call_command(
+            'export_data', 'posts', output=path, until='2010-01-01',
+            stderr=StringIO())
+        call_command(
+            'export_data', 'posts', output=path, after=self.posts[0].pk,
+            stderr=StringIO())
+        with open(path, encoding='utf-8') as file:
+            self.assertEqual(len(file.readlines()), 5)
+
+    def test_command_resume_csv(self):
+        """Продолжение CSV не повторяет заголовок."""
+        path = os.path.join(self.directory, 'posts.csv')
+        call_command(
+            'export_data', 'posts', output=path, format='csv',
+            until='2010-01-01', stderr=StringIO())
+        call_command(
+            'export_data', 'posts', output=path, format='csv',
+            after=self.posts[0].pk, stderr=StringIO())
+        with open(path, encoding='utf-8', newline='') as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows[0][0], 'id')
+        self.assertEqual([row[0] for row in rows].count('id'), 1)
+        self.assertEqual(
+            [row[0] for row in rows[1:]],
+            [str(post.pk) for post in self.posts])
+
+    def test_view_gzip(self):
+        response = self.staff_client.get(
+            reverse('posts:export', args=['posts']),
+            {'gzip': 1, 'after': self.posts[2].pk})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        data = gzip.decompress(b''.join(response.streaming_content))
+        ids = [json.loads(line)['id'] for line in data.splitlines()]
+        self.assertEqual(ids, [self.posts[3].pk, self.posts[4].pk])
+
+    def test_view_csv(self):
+        response = self.staff_client.get(
+            reverse('posts:export', args=['follows']), {'format': 'csv'})
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content.splitlines(), ['id,user_id,author_id'])
+
+    def test_view_staff_only_and_errors(self):
+        client = Client()
+        client.force_login(ExportTest.user)
+        url = reverse('posts:export', args=['posts'])
+        self.assertEqual(client.get(url).status_code, 302)
+        for params in ({'since': 'вчера'}, {'format': 'xml'},
+                       {'after': 'x'}):
+            with self.subTest(params=params):
+                response = self.staff_client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+        response = self.staff_client.get(
+            reverse('posts:export', args=['users']))
+        self.assertEqual(response.status_code, 400)
@@ -5,6 +5,7 @@ from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from posts.forms import PostForm
 from posts.models import Post,  Comment
+from posts.storage import content_name, digest
 import shutil
 import tempfile
 from django.conf import settings
@@ -72,7 +73,9 @@ class TestCreateForm(TestCase):
         image = obj.image
         self.assertEqual(str(text), 'Тестовый пост')
         self.assertEqual(str(author), 'auth')
-        self.assertEqual(image, 'posts/small.gif')
+        with image.open() as stored:
+            name = content_name('posts/small.gif', digest(stored))
+        self.assertEqual(image, name)
 
     def test_create_guest_client(self):
         """Проверка создание записи неавторизованного юзера"""
@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import fragments, generation
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostFragmentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='')
+        for i in range(3):
+            Post.objects.create(
+                author=cls.user, text=f'Пост {i}', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(PostFragmentTest.user)
+
+    def posts(self):
+        return list(Post.objects.select_related('author', 'group'))
+
+    def test_page_uses_one_get_many(self):
+        """Фрагменты страницы читаются одним get_many, промахи рендерятся."""
+        with mock.patch.object(
+            fragments, 'render_to_string', wraps=fragments.render_to_string,
+        ) as render, mock.patch.object(
+            fragments.cache, 'get_many', wraps=fragments.cache.get_many,
+        ) as get_many:
+            fragments.render_many(self.posts())
+            fragments.render_many(self.posts())
+        self.assertEqual(render.call_count, 3)
+        self.assertEqual(get_many.call_count, 2)
+
+    def test_key_changes(self):
+        """Ключ меняется при правке, переименовании автора и смене группы."""
+        post = self.posts()[0]
+        keys = {fragments.key(post)}
+        post.text = 'Исправлено'
+        keys.add(fragments.key(post))
+        post.author.first_name = 'Новое имя'
+        keys.add(fragments.key(post))
+        post.group = None
+        keys.add(fragments.key(post))
+        keys.add(fragments.key(post, show_group=False))
+        self.assertEqual(len(keys), 5)
+
+    def test_pages_show_fresh_content(self):
+        response = self.client.get(
+            reverse('posts:second', args=['test-slug']))
+        self.assertContains(response, 'Пост 1')
+        self.assertNotContains(response, 'все записи сообщества')
+        self.assertContains(response, '<hr>', count=2)
+        Post.objects.filter(text='Пост 1').update(text='Пост изменён')
+        # update() минует сигналы; общую оболочку страницы сбрасываем
+        # сами, список постов должен обновиться за счёт ключей фрагментов.
+        generation.bump()
+        response = self.client.get(
+            reverse('posts:second', args=['test-slug']))
+        self.assertContains(response, 'Пост изменён')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'все записи сообщества', count=3)
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TransactionTestCase
+from django.urls import reverse
+
+from core import holes
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class SharedShellTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.post = Post.objects.create(author=self.author, text='Общий пост')
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client(enforce_csrf_checks=True)
+        self.reader_client.force_login(self.reader)
+
+    def test_shell_shared_between_users(self):
+        """Второй пользователь получает оболочку без повторного рендера."""
+        url = reverse('posts:profile', args=['author'])
+        response = self.author_client.get(url)
+        self.assertIn('page_obj', response.context)
+        self.assertContains(response, 'Пользователь: author')
+        self.assertNotContains(response, 'Подписаться')
+        response = self.reader_client.get(url)
+        self.assertNotIn('page_obj', response.context)
+        self.assertContains(response, 'Общий пост')
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertContains(response, 'Отписаться')
+        self.assertNotContains(response, '<!--hole:')
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_follow_counts_in_shell(self):
+        """Оболочка профиля обновляется после подписки и отписки."""
+        url = reverse('posts:profile', args=['reader'])
+        self.assertContains(self.author_client.get(url), 'Подписчиков: 0')
+        self.author_client.get(
+            reverse('posts:profile_follow', args=['reader']))
+        self.assertContains(self.reader_client.get(url), 'Подписчиков: 1')
+        self.author_client.get(
+            reverse('posts:profile_unfollow', args=['reader']))
+        self.assertContains(self.author_client.get(url), 'Подписчиков: 0')
+
+    def test_holes_on_post_detail(self):
+        """Ссылка на правку и CSRF-токен формы — у каждого свои."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        edit = reverse('posts:post_edit', args=[self.post.pk])
+        self.assertContains(self.author_client.get(url), edit)
+        response = self.reader_client.get(url)
+        self.assertNotContains(response, edit)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        response = self.reader_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {
+                'text': 'Комментарий',
+                'csrfmiddlewaretoken': response.context['csrf_token'],
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_forged_marker(self):
+        request = RequestFactory().get('/')
+        self.assertEqual(holes.fill(request, 'a<!--hole:forged-->b'), 'ab')
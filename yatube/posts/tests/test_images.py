@@ -0,0 +1,113 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.images import normalize
+from posts.models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION = 0x0112
+
+
+def jpeg(size=(300, 100), orientation=None, name='photo.jpg'):
+    image = Image.new('RGB', size, 'red')
+    exif = Image.Exif()
+    exif[0x010F] = 'Камера'
+    if orientation:
+        exif[ORIENTATION] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', exif=exif.tobytes(), quality=100)
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIDE=100, IMAGE_FORMAT=None)
+class NormalizeTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_rotate_downscale_strip(self):
+        """Поворот по EXIF применяется до уменьшения, метаданные удаляются."""
+        upload, width, height = normalize(jpeg(orientation=6))
+        self.assertEqual((width, height), (33, 100))
+        self.assertEqual(upload.name, 'photo.jpg')
+        image = Image.open(upload)
+        self.assertEqual(image.size, (33, 100))
+        self.assertEqual(dict(image.getexif()), {})
+
+    @override_settings(IMAGE_FORMAT='WEBP')
+    def test_webp(self):
+        upload, width, height = normalize(jpeg(size=(50, 40)))
+        self.assertEqual(upload.name, 'photo.webp')
+        self.assertEqual((width, height), (50, 40))
+        self.assertEqual(Image.open(upload).format, 'WEBP')
+
+    @override_settings(IMAGE_MAX_PIXELS=1000)
+    def test_pixel_limit(self):
+        """Слишком большая картинка отклоняется до декодирования."""
+        with self.assertRaises(ValidationError):
+            normalize(jpeg(size=(100, 100)))
+
+    def test_post_create(self):
+        """Форма сохраняет нормализованную картинку и её размеры."""
+        user = User.objects.create_user(username='auth')
+        client = Client()
+        client.force_login(user)
+        client.post(reverse('posts:post_create'), {
+            'text': 'Фото', 'image': jpeg(size=(400, 200)),
+        })
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+        self.assertEqual(post.image_size, post.image.size)
+        client.post(reverse('posts:post_edit', args=[post.pk]), {
+            'text': 'Без фото', 'image-clear': 'on',
+        })
+        post.refresh_from_db()
+        self.assertFalse(post.image)
+        self.assertIsNone(post.image_width)
+
+    def test_admin_upload(self):
+        """Картинка из админки проходит ту же нормализацию."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        client = Client()
+        client.force_login(admin)
+        client.post(reverse('admin:posts_post_add'), {
+            'text': 'Фото', 'author': admin.pk, 'image': jpeg(size=(400, 200)),
+        })
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+        self.assertEqual(Image.open(post.image).size, (100, 50))
+
+    @override_settings(IMAGE_MAX_PIXELS=1000)
+    def test_rejected_image(self):
+        """Отклонённая картинка возвращает заполненную форму с ошибкой."""
+        user = User.objects.create_user(username='auth')
+        post = Post.objects.create(author=user, text='Пост')
+        client = Client()
+        client.force_login(user)
+        for url in (
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', args=[post.pk]),
+        ):
+            with self.subTest(url=url):
+                response = client.post(url, {
+                    'text': 'Фото', 'image': jpeg(size=(100, 100)),
+                })
+                self.assertEqual(response.status_code, 200)
+                form = response.context['form']
+                self.assertIn('image', form.errors)
+                self.assertEqual(form['text'].value(), 'Фото')
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Пост'])
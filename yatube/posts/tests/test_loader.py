@@ -0,0 +1,152 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Max
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.loader import Loader
+from posts.models import Comment, Follow, Group, MediaFile, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class LoadYatubeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        User.objects.create_user(username='existing')
+        self.write('users.jsonl', [
+            {'id': 'a', 'username': 'anna'},
+            {'id': 'b', 'username': 'boris', 'first_name': 'Борис'},
+        ])
+        with open(os.path.join(self.directory, 'groups.csv'), 'w') as file:
+            file.write('id,slug,title,description\n7,cats,Коты,Про котов\n')
+        self.write('posts.jsonl', [
+            {'id': 10, 'author': 'a', 'group': 7, 'text': 'Первый',
+             'created': '2020-01-01T10:00:00'},
+            {'id': 11, 'author': 'b', 'group': '', 'text': 'Второй'},
+            {'id': 12, 'author': 'b', 'group': 7, 'text': 'Третий'},
+        ])
+        self.write('follows.jsonl', [{'user': 'a', 'author': 'b'}])
+
+    def write(self, name, rows):
+        with open(os.path.join(self.directory, name), 'w') as file:
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def load(self, batch_size=2):
+        call_command(
+            'load_yatube', self.directory,
+            batch_size=batch_size, stdout=StringIO())
+
+    def test_load(self):
+        """Связи разрешаются по id из файлов, счётчики и ленты готовы."""
+        self.write('comments.jsonl', [
+            {'id': 1, 'post': 10, 'author': 'b', 'text': 'Коммент'},
+        ])
+        self.load()
+        anna = User.objects.get(username='anna')
+        first = Post.objects.get(text='Первый')
+        self.assertEqual(first.author, anna)
+        self.assertEqual(first.group.slug, 'cats')
+        self.assertEqual(first.created.year, 2020)
+        self.assertIsNone(Post.objects.get(text='Второй').group)
+        self.assertEqual(Comment.objects.get().post, first)
+        self.assertEqual(first.comments_count, 1)
+        self.assertEqual(Group.objects.get().posts_count, 2)
+        self.assertTrue(Follow.objects.filter(
+            user=anna, author__username='boris').exists())
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=anna).count(), 2)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.directory, '.load_yatube.json')))
+
+    def test_restart_after_failure(self):
+        """После ошибки повторный запуск не дублирует записанные строки."""
+        self.write('comments.jsonl', [
+            {'id': 1, 'post': 10, 'author': 'b', 'text': 'Раз'},
+            {'id': 2, 'post': 11, 'author': 'a', 'text': 'Два'},
+            {'id': 3, 'post': 99, 'author': 'a', 'text': 'Битый'},
+        ])
+        with self.assertRaises(CommandError):
+            self.load()
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.write('comments.jsonl', [
+            {'id': 1, 'post': 10, 'author': 'b', 'text': 'Раз'},
+            {'id': 2, 'post': 11, 'author': 'a', 'text': 'Два'},
+            {'id': 3, 'post': 12, 'author': 'a', 'text': 'Исправлен'},
+        ])
+        self.load()
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(Comment.objects.count(), 3)
+        self.assertEqual(
+            Comment.objects.get(text='Исправлен').post.text, 'Третий')
+
+    def test_restart_after_lost_state(self):
+        """Пачки, записанные до сбоя состояния, не вставляются повторно."""
+        self.write('follows.jsonl', [
+            {'user': 'a', 'author': 'b'},
+            {'user': 'a', 'author': 'b'},
+            {'user': 'b', 'author': 'b'},
+        ])
+        loader = Loader(self.directory, batch_size=2, log=lambda line: None)
+        loader.run()
+        for progress in loader.state.values():
+            progress['done'] = 0
+        loader.save_state()
+        self.load()
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(
+            list(Follow.objects.values_list(
+                'user__username', 'author__username')),
+            [('anna', 'boris')],
+        )
+
+    def test_site_writes_during_load(self):
+        """Записи сайта посреди загрузки получают ключи за резервом."""
+        flush = Loader.flush
+
+        def flush_and_write(loader, kind, *args):
+            loaded = flush(loader, kind, *args)
+            if kind == 'posts' and loader.state[kind]['done'] == 1:
+                Post.objects.create(
+                    author=User.objects.get(username='existing'),
+                    text='С сайта', created=timezone.now())
+            return loaded
+
+        with mock.patch.object(Loader, 'flush', flush_and_write):
+            self.load(batch_size=1)
+        print(list(Post.objects.values_list("pk","text")))
+        self.assertEqual(Post.objects.count(), 4)
+        site = Post.objects.get(text='С сайта')
+        self.assertGreater(
+            site.pk, Post.objects.exclude(pk=site.pk).aggregate(
+                top=Max('pk'))['top'])
+
+    def test_image_references(self):
+        """Общая картинка из выгрузки учитывается в MediaFile."""
+        self.write('posts.jsonl', [
+            {'id': 10, 'author': 'a', 'text': 'Раз', 'image': 'posts/a.gif'},
+            {'id': 11, 'author': 'b', 'text': 'Два', 'image': 'posts/a.gif'},
+            {'id': 12, 'author': 'b', 'text': 'Три', 'image': 'posts/b.gif'},
+        ])
+        MediaFile.objects.create(name='posts/b.gif', references=1)
+        self.load()
+        self.assertEqual(
+            dict(MediaFile.objects.values_list('name', 'references')),
+            {'posts/a.gif': 2, 'posts/b.gif': 2},
+        )
@@ -1,7 +1,12 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
 
-from posts.models import Group, Post
+from posts.models import Comment, Follow, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -33,3 +38,110 @@ class PostModelTest(TestCase):
         post = PostModelTest.post
         expected_object_name = post.text[:15]
         self.assertEqual(expected_object_name, str(post))
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+
+    def counts(self):
+        stats = UserStats.objects.get(user=CountersTest.user)
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        return (
+            stats.posts_count,
+            stats.followers_count,
+            self.group.posts_count,
+            self.other_group.posts_count,
+        )
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        post = Post.objects.create(
+            author=CountersTest.user, text='пост', group=CountersTest.group)
+        Follow.objects.create(
+            user=CountersTest.reader, author=CountersTest.user)
+        Comment.objects.create(
+            post=post, author=CountersTest.reader, text='коммент')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.counts(), (1, 1, 1, 0))
+        self.assertEqual(
+            UserStats.objects.get(user=CountersTest.reader).following_count,
+            1)
+        post.group = CountersTest.other_group
+        post.save()
+        self.assertEqual(self.counts(), (1, 1, 0, 1))
+        Follow.objects.filter(user=CountersTest.reader).delete()
+        post.delete()
+        self.assertEqual(self.counts(), (0, 0, 0, 0))
+
+    def test_drifted_counter_not_negative(self):
+        """Удаление при обнулённом счётчике не падает и оставляет ноль."""
+        post = Post.objects.create(
+            author=CountersTest.user, text='пост', group=CountersTest.group)
+        UserStats.objects.update(posts_count=0)
+        Group.objects.update(posts_count=0)
+        post.delete()
+        self.assertEqual(self.counts(), (0, 0, 0, 0))
+
+    def test_recount(self):
+        """Команда recount чинит разъехавшиеся счётчики."""
+        Post.objects.create(
+            author=CountersTest.user, text='пост', group=CountersTest.group)
+        UserStats.objects.update(posts_count=42)
+        Group.objects.update(posts_count=42)
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(self.counts(), (1, 0, 1, 0))
+
+
+class CountersMigrationTest(TransactionTestCase):
+    before = [('posts', '0009_timelineentry')]
+    after = [('posts', '0011_indexes')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def test_counters_filled(self):
+        """Миграции считают счётчики на исторических моделях."""
+        apps = self.migrate(self.before)
+        author = apps.get_model('auth', 'User').objects.create(
+            username='auth')
+        reader = apps.get_model('auth', 'User').objects.create(
+            username='reader')
+        post = apps.get_model('posts', 'Post').objects.create(
+            author=author, text='пост')
+        apps.get_model('posts', 'Comment').objects.create(
+            post=post, author=reader, text='коммент')
+        follow = apps.get_model('posts', 'Follow').objects
+        follow.create(user=reader, author=author)
+        follow.create(user=reader, author=author)
+        apps = self.migrate(self.after)
+        stats = apps.get_model('posts', 'UserStats').objects
+        self.assertEqual(
+            stats.values_list('posts_count', 'followers_count').get(
+                user=author.pk),
+            (1, 1))
+        self.assertEqual(stats.get(user=reader.pk).following_count, 1)
+        self.assertEqual(
+            apps.get_model('posts', 'Post').objects.get().comments_count, 1)
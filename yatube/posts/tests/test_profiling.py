@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import profiling
+
+User = get_user_model()
+
+TEMP_PROFILING_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(PROFILING_DIR=TEMP_PROFILING_DIR)
+class ProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_PROFILING_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_PROFILING_DIR, ignore_errors=True)
+        self.guest = Client()
+        self.user_client = Client()
+        self.user_client.force_login(ProfilingTest.user)
+        self.staff_client = Client()
+        self.staff_client.force_login(ProfilingTest.staff)
+
+    def test_staff_flag(self):
+        """Флаг ?profile профилирует запрос только для staff."""
+        response = self.user_client.get(
+            reverse('posts:index'), {'profile': 1})
+        self.assertNotIn('X-Profile', response)
+        self.assertEqual(profiling.captures(), [])
+        response = self.staff_client.get(
+            reverse('posts:index'), {'profile': 1})
+        name = response['X-Profile']
+        self.assertTrue(
+            os.path.isfile(os.path.join(TEMP_PROFILING_DIR, name)))
+
+    def test_signed_header(self):
+        """Подписанный заголовок работает и для гостя, поддельный — нет."""
+        response = self.guest.get(
+            reverse('posts:index'), HTTP_X_PROFILE='profile:forged')
+        self.assertNotIn('X-Profile', response)
+        response = self.guest.get(
+            reverse('posts:index'), HTTP_X_PROFILE=profiling.make_token())
+        self.assertIn('X-Profile', response)
+        self.assertEqual(len(profiling.captures()), 1)
+
+    def test_listing_staff_only(self):
+        name = self.staff_client.get(
+            reverse('posts:index'), {'profile': 1})['X-Profile']
+        response = self.user_client.get(reverse('core:profiles'))
+        self.assertEqual(response.status_code, 302)
+        response = self.staff_client.get(reverse('core:profiles'))
+        self.assertContains(response, name)
+        response = self.staff_client.get(
+            reverse('core:profile_capture', args=[name]))
+        self.assertContains(response, 'function calls')
+        response = self.staff_client.get(
+            reverse('core:profile_capture', args=['..%2Fsettings.py']))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,148 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (
+    Client, RequestFactory, TestCase, override_settings,
+)
+from django.urls import resolve, reverse
+
+from core.middleware import (
+    QueryBudgetExceeded, QueryBudgetMiddleware, query_shape,
+)
+from posts.models import Comment, Follow, Group, Post
+from posts.tests.test_images import jpeg
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(QUERY_BUDGET_ENFORCE=True, MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='reader', is_staff=True, is_superuser=True)
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(3)
+        ]
+        cls.groups = [
+            Group.objects.create(title=f'Группа {i}', slug=f'group-{i}')
+            for i in range(3)
+        ]
+        for i in range(15):
+            post = Post.objects.create(
+                author=cls.authors[i % 3],
+                group=cls.groups[i % 3],
+                text=f'Тестовый пост номер {i}',
+            )
+            Comment.objects.create(
+                post=post, author=cls.authors[(i + 1) % 3], text='Коммент')
+        for author in cls.authors[:2]:
+            Follow.objects.create(user=cls.user, author=author)
+        Post.objects.create(author=cls.user, text='Свой пост')
+        cls.post = Post.objects.filter(author=cls.authors[0]).first()
+        cls.own = Post.objects.get(author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(QueryBudgetTest.user)
+
+    def test_views_within_budget(self):
+        """Каждая страница укладывается в свой бюджет запросов."""
+        author = QueryBudgetTest.authors[2].username
+        pages = [
+            ('get', reverse('posts:index'), {}),
+            ('get', reverse('posts:second', args=['group-0']), {}),
+            ('get', reverse('posts:profile', args=[author]), {}),
+            ('get', reverse('posts:post_detail', args=[self.post.pk]), {}),
+            ('get', reverse('posts:post_comments', args=[self.post.pk]), {}),
+            ('get', reverse('posts:post_create'), {}),
+            ('get', reverse('posts:post_edit', args=[self.own.pk]), {}),
+            ('get', reverse('posts:follow_index'), {}),
+            ('get', reverse('posts:search'), {'q': 'пост'}),
+            ('get', reverse('posts:export', args=['posts']), {}),
+            ('get', reverse('posts:export', args=['comments']),
+             {'format': 'csv', 'gzip': ''}),
+            ('get', reverse('posts:api_posts'), {}),
+            ('get', reverse('posts:api_posts'), {'group': 'group-0'}),
+            ('get', reverse('posts:api_comments', args=[self.post.pk]), {}),
+            ('get', reverse('posts:api_groups'), {}),
+            ('get', reverse('posts:api_profile', args=[author]), {}),
+            ('get', reverse('posts:api_follow'), {}),
+            ('post', reverse('posts:post_create'), {'text': 'Новый'}),
+            ('post', reverse('posts:post_create'),
+             {'text': 'С картинкой', 'image': jpeg()}),
+            ('post', reverse('posts:post_edit', args=[self.own.pk]),
+             {'text': 'Правка'}),
+            ('post', reverse('posts:post_edit', args=[self.own.pk]),
+             {'text': 'Картинка', 'image': jpeg(size=(30, 10))}),
+            ('post', reverse('posts:post_edit', args=[self.own.pk]),
+             {'text': 'Замена', 'image': jpeg(size=(40, 10))}),
+            ('post', reverse('admin:posts_post_add'),
+             {'text': 'Из админки', 'author': self.user.pk,
+              'image': jpeg(size=(50, 10))}),
+            ('post', reverse('posts:add_comment', args=[self.post.pk]),
+             {'text': 'Ещё коммент'}),
+            ('get', reverse('posts:profile_follow', args=[author]), {}),
+            ('get', reverse('posts:profile_unfollow', args=[author]), {}),
+        ]
+        for method, url, data in pages:
+            with self.subTest(url=url, method=method):
+                response = getattr(self.client, method)(url, data)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                self.assertLess(response.status_code, 400)
+                if method == 'post':
+                    self.assertEqual(response.status_code, 302)
+                self.assertIn('X-DB-Queries', response)
+                self.assertIn('X-DB-Time', response)
+
+    @override_settings(QUERY_BUDGETS={'posts:index': 1})
+    def test_budget_exceeded(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('posts:index'))
+
+    @override_settings(QUERY_BUDGETS={'posts:export': 2})
+    def test_streamed_budget_exceeded(self):
+        """Запросы потоковой выгрузки считаются при её чтении."""
+        response = self.client.get(reverse('posts:export', args=['posts']))
+        with self.assertRaises(QueryBudgetExceeded):
+            b''.join(response.streaming_content)
+
+    @override_settings(QUERY_BUDGET_ENFORCE=False)
+    def test_headers(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertGreater(int(response['X-DB-Queries']), 0)
+        self.assertGreaterEqual(float(response['X-DB-Time']), 0)
+
+    @override_settings(QUERY_BUDGET_REPEATS=3)
+    def test_repeated_queries_logged(self):
+        """Одинаковый запрос в цикле попадает в лог как N+1."""
+        def view(request):
+            for post in Post.objects.all():
+                post.author.username
+            return HttpResponse()
+
+        request = RequestFactory().get(reverse('posts:index'))
+        request.resolver_match = resolve(request.path)
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            with self.assertRaises(QueryBudgetExceeded):
+                QueryBudgetMiddleware(view)(request)
+        self.assertIn('N+1 в posts:index: 16 раз', logs.output[0])
+
+    def test_query_shape(self):
+        self.assertEqual(
+            query_shape('SELECT 1 FROM t WHERE id IN (%s, %s, %s) LIMIT 21'),
+            'SELECT ? FROM t WHERE id IN (%s, ...) LIMIT ?',
+        )
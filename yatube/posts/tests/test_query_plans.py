@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.query_plan import forbid_full_scans, full_scans
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class QueryPlanTest(TestCase):
+    """Ни одна вьюха posts не читает posts_post целиком."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'пост {i}', group=cls.group)
+            for i in range(15)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='коммент')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(QueryPlanTest.reader)
+
+    def test_read_views(self):
+        post = QueryPlanTest.posts[0]
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:second', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+            reverse('posts:post_comments', kwargs={'post_id': post.pk}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_create'),
+        )
+        for url in urls:
+            for params in ({}, {'page': 2}):
+                with self.subTest(url=url, params=params):
+                    with forbid_full_scans():
+                        response = self.client.get(url, params)
+                    page_obj = response.context.get('page_obj')
+                    if page_obj is None or not page_obj.has_next():
+                        continue
+                    with forbid_full_scans():
+                        self.client.get(url, {'cursor': page_obj.next_cursor})
+
+    def test_write_views(self):
+        post = QueryPlanTest.posts[0]
+        with forbid_full_scans():
+            self.client.post(
+                reverse('posts:post_create'), {'text': 'новый пост'})
+            self.client.post(
+                reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+                {'text': 'ещё коммент'},
+            )
+            self.client.get(reverse(
+                'posts:profile_unfollow', kwargs={'username': 'author'}))
+            self.client.get(reverse(
+                'posts:profile_follow', kwargs={'username': 'author'}))
+        self.client.force_login(QueryPlanTest.author)
+        with forbid_full_scans():
+            self.client.post(
+                reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+                {'text': 'правка', 'group': QueryPlanTest.group.pk},
+            )
+
+    def test_hidden_full_scans(self):
+        """Покрывающий индекс и LIMIT не прячут чтение всей таблицы."""
+        scans = {
+            'SELECT COUNT(*) FROM "posts_post"': True,
+            'SELECT "posts_post"."id" FROM "posts_post" '
+            'WHERE "posts_post"."text" LIKE \'%пост%\' '
+            'ORDER BY "posts_post"."created" DESC LIMIT 10': True,
+            'SELECT "posts_post"."id" FROM "posts_post" '
+            'ORDER BY "posts_post"."created" DESC, "posts_post"."id" DESC '
+            'LIMIT 10': False,
+            'SELECT "posts_post"."id" FROM "posts_post" '
+            'WHERE "posts_post"."author_id" = 1 LIMIT 10': False,
+        }
+        for sql, expected in scans.items():
+            with self.subTest(sql=sql):
+                self.assertEqual(bool(full_scans(sql, 'posts_post')), expected)
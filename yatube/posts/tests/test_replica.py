@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import tempfile
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import routers
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICA_READS=True)
+class ReplicaRouterTest(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=self.user, text='Тест')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.client.cookies.pop(settings.REPLICA_PIN_COOKIE, None)
+        routers.mark_synced('replica', time.time())
+
+    def replica_queries(self, method, url, data=None, client=None):
+        client = client or self.client
+        with CaptureQueriesContext(connections['replica']) as queries:
+            response = getattr(client, method)(url, data or {})
+        return response, len(queries)
+
+    def test_listings_read_replica(self):
+        """Списки читаются с реплики, остальные страницы — с основной."""
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:profile', args=['auth']),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ):
+            with self.subTest(url=url):
+                self.assertGreater(self.replica_queries('get', url)[1], 0)
+        url = reverse('posts:post_edit', args=[self.post.pk])
+        self.assertEqual(self.replica_queries('get', url)[1], 0)
+
+    def test_pinned_after_write(self):
+        """После записи клиент читает основную базу."""
+        response, count = self.replica_queries(
+            'post', reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Коммент'})
+        self.assertEqual(count, 0)
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        _, count = self.replica_queries('get', reverse('posts:index'))
+        self.assertEqual(count, 0)
+
+    @override_settings(REPLICA_MAX_LAG=0)
+    def test_stale_replica_skipped(self):
+        """
+        До sync_replica после записи страницы строятся по основной базе,
+        и в кеш текущего поколения не попадает копия без нового поста.
+        """
+        guest = Client()
+        url = reverse('posts:index')
+        response, count = self.replica_queries('get', url, client=guest)
+        self.assertGreater(count, 0)
+        self.assertNotContains(response, 'Новый пост')
+        self.client.post(reverse('posts:post_create'), {'text': 'Новый пост'})
+        response, count = self.replica_queries('get', url, client=guest)
+        self.assertEqual(count, 0)
+        self.assertContains(response, 'Новый пост')
+        routers.mark_synced('replica', time.time())
+        _, count = self.replica_queries(
+            'get', reverse('posts:profile', args=['auth']), client=guest)
+        self.assertGreater(count, 0)
+
+    def test_write_outside_requests(self):
+        """Запись не из вьюхи тоже отмечается — после коммита."""
+        self.assertEqual(routers.fresh_replicas(), ['replica'])
+        with transaction.atomic():
+            Post.objects.create(author=self.user, text='Из команды')
+            self.assertEqual(routers.fresh_replicas(), ['replica'])
+        self.assertEqual(routers.fresh_replicas(), [])
+
+    def test_lagging_replica_not_cached(self):
+        """
+        Отстающая реплика читается, но страница по ней не кешируется и
+        не получает валидаторов.
+        """
+        guest = Client()
+        url = reverse('posts:index')
+        Post.objects.create(author=self.user, text='Новый пост')
+        for _ in range(2):
+            response, count = self.replica_queries('get', url, client=guest)
+            self.assertGreater(count, 0)
+            self.assertFalse(response.has_header('ETag'))
+        routers.mark_synced('replica', time.time())
+        self.replica_queries('get', url, client=guest)
+        response, count = self.replica_queries('get', url, client=guest)
+        self.assertEqual(count, 0)
+        self.assertTrue(response.has_header('ETag'))
+
+    @override_settings(DATABASE_REPLICA_READS=False)
+    def test_disabled(self):
+        _, count = self.replica_queries('get', reverse('posts:index'))
+        self.assertEqual(count, 0)
+
+    def test_sync_replica(self):
+        """Копия через backup API содержит данные основной базы."""
+        descriptor, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(descriptor)
+        self.addCleanup(os.remove, path)
+        call_command('sync_replica', output=path, stdout=StringIO())
+        with sqlite3.connect(path) as copy:
+            texts = copy.execute('SELECT text FROM posts_post').fetchall()
+        self.assertEqual(texts, [('Тест',)])
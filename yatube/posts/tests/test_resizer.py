@@ -0,0 +1,82 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from core import resizer
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ResizerTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        Image.new('RGB', (400, 200), 'blue').save(
+            os.path.join(TEMP_MEDIA_ROOT, 'posts', 'photo.jpg'))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, settings.IMAGE_CACHE_DIR),
+            ignore_errors=True)
+
+    def get(self, url):
+        response = self.client.get(url)
+        return response, b''.join(response.streaming_content)
+
+    def test_resize_then_cache(self):
+        """Первый запрос делает картинку, второй берёт её из кеша."""
+        url = resizer.url('posts/photo.jpg', '100')
+        response, body = self.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Image.open(io.BytesIO(body)).size, (100, 50))
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+        with mock.patch.object(resizer, 'pool') as pool:
+            response, again = self.get(url)
+        pool.assert_not_called()
+        self.assertEqual(again, body)
+
+    def test_crop_and_format(self):
+        url = resizer.url('posts/photo.jpg', '50x50', crop=True,
+                          image_format='webp')
+        response, body = self.get(url)
+        image = Image.open(io.BytesIO(body))
+        self.assertEqual((image.format, image.size), ('WEBP', (50, 50)))
+
+    def test_no_upscale(self):
+        """Запрошенный размер больше исходника: картинка не растёт."""
+        for url, size in (
+            (resizer.url('posts/photo.jpg', '800'), (400, 200)),
+            (resizer.url('posts/photo.jpg', 'x800'), (400, 200)),
+            (resizer.url('posts/photo.jpg', '800x800', crop=True),
+             (200, 200)),
+        ):
+            with self.subTest(url=url):
+                _, body = self.get(url)
+                self.assertEqual(Image.open(io.BytesIO(body)).size, size)
+
+    def test_bad_token(self):
+        url = resizer.url('posts/photo.jpg', '100')
+        self.assertEqual(self.client.get(url[:-3] + 'x/').status_code, 404)
+        missing = resizer.url('posts/missing.jpg', '100')
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+    @override_settings(IMAGE_RESIZE_QUEUE=0)
+    def test_busy(self):
+        """Переполненная очередь отвечает 503, а не ждёт."""
+        response = self.client.get(resizer.url('posts/photo.jpg', '70'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
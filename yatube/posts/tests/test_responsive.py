@@ -0,0 +1,50 @@
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from core import resizer
+
+
+@override_settings(
+    IMAGE_VARIANT_WIDTHS=(260, 520), IMAGE_VARIANT_FORMATS=('webp', None))
+class ResponsiveImageTest(SimpleTestCase):
+    def render(self, arguments, name='posts/missing.jpg'):
+        template = Template(
+            '{% load images %}{% responsive_image ' + arguments + ' %}')
+        return template.render(Context({'name': name}))
+
+    def test_variants(self):
+        """WebP идёт отдельным source, исходный формат — в srcset у img."""
+        html = self.render('name 1000 500 width=260')
+        for size in (260, 520):
+            with self.subTest(size=size):
+                webp = resizer.url(
+                    'posts/missing.jpg', str(size), image_format='webp')
+                jpeg = resizer.url('posts/missing.jpg', str(size))
+                self.assertIn(f'{webp} {size}w', html)
+                self.assertIn(f'{jpeg} {size}w', html)
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn(
+            f'src="{resizer.url("posts/missing.jpg", "260")}"', html)
+
+    def test_no_upscaled_variants(self):
+        """Ширины больше исходной заменяются самой исходной."""
+        html = self.render('name 300 150 width=260')
+        for size in (260, 300):
+            self.assertIn(f'{resizer.url("posts/missing.jpg", str(size))} '
+                          f'{size}w', html)
+        self.assertNotIn(resizer.url('posts/missing.jpg', '520'), html)
+
+    def test_dimensions_without_file(self):
+        """Размеры берутся из аргументов, файла может и не быть."""
+        html = self.render('name 1000 500 height=100')
+        self.assertIn('width="200" height="100"', html)
+        self.assertIn('sizes="200px"', html)
+        self.assertIn('loading="lazy"', html)
+
+    def test_unknown_dimensions(self):
+        html = self.render('name width=260')
+        self.assertNotIn('height=', html)
+        self.assertIn('sizes="260px"', html)
+
+    def test_empty(self):
+        self.assertEqual(self.render('name', name=''), '')
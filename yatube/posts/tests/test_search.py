@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.best = Post.objects.create(
+            author=cls.user, text='Кот, кот и ещё раз кот', group=cls.group)
+        cls.weak = Post.objects.create(
+            author=cls.other, text='Про собаку, и немного про кот <b>')
+        Post.objects.create(author=cls.user, text='Совсем о другом')
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, **params):
+        response = self.client.get(reverse('posts:search'), params)
+        return response.context['page_obj']
+
+    def test_ranked_and_highlighted(self):
+        """Выдача отсортирована по bm25 и подсвечена."""
+        page = self.search(q='КОТ')
+        self.assertEqual(list(page), [SearchTest.best, SearchTest.weak])
+        self.assertIn('<mark>кот</mark>', page[0].snippet)
+        self.assertIn('&lt;b&gt;', page[1].snippet)
+
+    def test_filters(self):
+        """Фильтры по группе и автору."""
+        self.assertEqual(
+            list(self.search(q='кот', group='test-slug')), [SearchTest.best])
+        self.assertEqual(
+            list(self.search(q='кот', author='other')), [SearchTest.weak])
+
+    def test_unknown_filters(self):
+        """Неизвестные группа или автор не расширяют выдачу."""
+        self.assertEqual(list(self.search(q='кот', group='missing')), [])
+        self.assertEqual(list(self.search(q='кот', author='missing')), [])
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'кот', 'author': 'missing'})
+        self.assertContains(response, 'value="missing"')
+
+    def test_index_follows_edits(self):
+        """Триггеры держат индекс в актуальном состоянии."""
+        post = Post.objects.get(pk=SearchTest.weak.pk)
+        post.text = 'Теперь про попугая'
+        post.save()
+        self.assertEqual(list(self.search(q='попугай')), [])
+        self.assertEqual(list(self.search(q='попугая')), [post])
+        self.assertEqual(list(self.search(q='собаку')), [])
+        Post.objects.filter(pk=SearchTest.best.pk).delete()
+        self.assertEqual(list(self.search(q='кот')), [])
+
+    def test_cursor(self):
+        """Курсор листает выдачу по одной записи."""
+        Post.objects.bulk_create(
+            Post(author=SearchTest.user, text=f'кот номер {i}')
+            for i in range(12)
+        )
+        first = self.search(q='кот')
+        self.assertEqual(len(first), 10)
+        second = self.search(q='кот', cursor=first.next_cursor)
+        self.assertEqual(len(second), 4)
+        self.assertTrue(set(first).isdisjoint(second))
+        back = self.search(q='кот', cursor=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+
+    def test_fts_syntax_is_escaped(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'кот" OR NEAR(*'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_punctuation(self):
+        """Запрос без слов в админке отдаёт список без фильтра."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': '?!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 3)
@@ -0,0 +1,89 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from core import stampede
+
+
+@override_settings(STAMPEDE_WAIT=2.0, STAMPEDE_BETA=1.0)
+class StampedeTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_single_flight(self):
+        """Параллельный промах пересчитывается ровно один раз."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.3)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                stampede.get_or_set('key', compute, 60)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 5)
+
+    def test_stale_while_locked(self):
+        """Пока другой пересчитывает, отдаётся устаревшее значение."""
+        stampede.get_or_set('key', lambda: 'old', 1)
+        cache.add('key:lock', 1)
+        with mock.patch('time.time', return_value=time.time() + 2):
+            self.assertEqual(
+                stampede.get_or_set('key', lambda: 'new', 1), 'old')
+        cache.delete('key:lock')
+        with mock.patch('time.time', return_value=time.time() + 2):
+            self.assertEqual(
+                stampede.get_or_set('key', lambda: 'new', 1), 'new')
+
+    def test_early_refresh(self):
+        """Долгий пересчёт обновляется заранее, до срока."""
+        cache.set('key', ('old', time.time() + 10, 5.0))
+        with mock.patch('random.random', return_value=0.99):
+            self.assertEqual(
+                stampede.get_or_set('key', lambda: 'new', 60), 'new')
+        cache.set('key', ('old', time.time() + 10, 5.0))
+        with mock.patch('random.random', return_value=0.1):
+            self.assertEqual(
+                stampede.get_or_set('key', lambda: 'new', 60), 'old')
+
+    def test_should_cache(self):
+        stampede.get_or_set('key', lambda: 'skip', 60,
+                            should_cache=lambda value: False)
+        self.assertIsNone(cache.get('key'))
+
+    def test_decorator(self):
+        calls = []
+
+        @stampede.single_flight(60)
+        def square(number):
+            calls.append(number)
+            return number * number
+
+        self.assertEqual([square(3), square(3), square(4)], [9, 9, 16])
+        self.assertEqual(calls, [3, 4])
+
+    def test_template_tag(self):
+        template = Template(
+            '{% load stampede %}'
+            '{% stampede_cache 60 fragment name %}{{ value }}'
+            '{% endstampede_cache %}'
+        )
+        context = {'name': 'a', 'value': 'первый'}
+        self.assertEqual(template.render(Context(context)), 'первый')
+        context['value'] = 'второй'
+        self.assertEqual(template.render(Context(context)), 'первый')
+        context['name'] = 'b'
+        self.assertEqual(template.render(Context(context)), 'второй')
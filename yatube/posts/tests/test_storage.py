@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import TransactionTestCase, override_settings
+
+from posts.models import MediaFile, Post
+from posts.storage import (
+    content_name, digest, is_content_name, post_images,
+)
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def media_files():
+    found = []
+    for root, _, files in os.walk(TEMP_MEDIA_ROOT):
+        found += [
+            os.path.relpath(os.path.join(root, name), TEMP_MEDIA_ROOT)
+            for name in files
+        ]
+    return sorted(found)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.user = User.objects.create_user(username='auth')
+
+    def post(self, content, name='photo.gif'):
+        post = Post(author=self.user, text='Пост')
+        post.image.save(name, ContentFile(content), save=False)
+        post.save()
+        return post
+
+    def test_sharded_name(self):
+        post = self.post(b'first')
+        hexdigest = digest(ContentFile(b'first'))
+        self.assertEqual(
+            post.image.name,
+            f'posts/{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}.gif',
+        )
+        self.assertTrue(is_content_name(post.image.name))
+
+    def test_deduplicated_and_counted(self):
+        """Одинаковый файл хранится раз и удаляется с последней ссылкой."""
+        first = self.post(b'same', 'a.gif')
+        second = self.post(b'same', 'b.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(media_files(), [first.image.name])
+        self.assertEqual(MediaFile.objects.get().references, 2)
+        first.delete()
+        self.assertEqual(media_files(), [second.image.name])
+        second.delete()
+        self.assertEqual(media_files(), [])
+        self.assertFalse(MediaFile.objects.exists())
+
+    def test_concurrent_upload(self):
+        """Файл, записанный параллельно после проверки, не получает суффикс."""
+        content = ContentFile(b'race')
+        name = content_name('posts/a.gif', digest(content))
+        post_images._save(name, ContentFile(b'race'))
+        with mock.patch.object(
+                post_images, 'exists', side_effect=[False, True]):
+            self.assertEqual(post_images.save('posts/a.gif', content), name)
+        self.assertEqual(media_files(), [name])
+
+    def test_upload_during_delete(self):
+        """Загрузка того же файла во время удаления его не теряет."""
+        first = self.post(b'same', 'a.gif')
+        uploads = []
+        update = QuerySet.update
+
+        def concurrent(queryset, **kwargs):
+            result = update(queryset, **kwargs)
+            if not uploads:
+                uploads.append(None)
+                uploads.append(self.post(b'same', 'b.gif'))
+            return result
+
+        with mock.patch.object(QuerySet, 'update', concurrent):
+            post_images.delete(first.image.name)
+        self.assertEqual(media_files(), [uploads[1].image.name])
+        self.assertEqual(MediaFile.objects.get().references, 1)
+
+    def test_rehash_command(self):
+        """Команда переносит старые файлы и сливает одинаковые."""
+        directory = os.path.join(TEMP_MEDIA_ROOT, 'posts')
+        os.makedirs(directory)
+        legacy = (('a.gif', b'x'), ('b.gif', b'x'), ('c.gif', b'y'))
+        for name, content in legacy:
+            with open(os.path.join(directory, name), 'wb') as file:
+                file.write(content)
+            Post.objects.create(
+                author=self.user, text=name, image=f'posts/{name}')
+        call_command('rehash_images', stdout=StringIO())
+        same = content_name('posts/a.gif', digest(ContentFile(b'x')))
+        other = content_name('posts/c.gif', digest(ContentFile(b'y')))
+        self.assertEqual(media_files(), sorted([same, other]))
+        self.assertEqual(
+            dict(Post.objects.values_list('text', 'image')),
+            {'a.gif': same, 'b.gif': same, 'c.gif': other},
+        )
+        self.assertEqual(MediaFile.objects.get(name=same).references, 2)
@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import resizer
+from posts import thumbnails
+from posts.management.commands.warm_thumbnails import PENDING_PER_WORKER
+from posts.models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+# Картинка шириной 2 px: по варианту на формат, без увеличенных.
+VARIANTS = len(resizer.variants(2))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, 'cache'), ignore_errors=True)
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'),
+        )
+
+    def thumbnail_files(self):
+        found = set()
+        for root, _, files in os.walk(os.path.join(TEMP_MEDIA_ROOT, 'cache')):
+            found.update(os.path.join(root, name) for name in files)
+        return found
+
+    def test_warm_thumbnails(self):
+        """Команда создаёт все размеры, и страницы берут готовые."""
+        call_command('warm_thumbnails', workers=2, stdout=StringIO())
+        created = self.thumbnail_files()
+        self.assertEqual(len(created), VARIANTS)
+        client = Client()
+        client.force_login(self.user)
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ):
+            with self.subTest(url=url):
+                client.get(url)
+                self.assertEqual(self.thumbnail_files(), created)
+
+    def test_warm_thumbnails_bounded(self):
+        """Команда не ставит в пул все посты сразу."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=str(number), image=self.post.image)
+            for number in range(20)
+        )
+        submitted = []
+        generated = []
+        submit = ThreadPoolExecutor.submit
+
+        def counted(pool, *args):
+            submitted.append(len(submitted) - len(generated))
+            return submit(pool, *args)
+
+        with mock.patch.object(ThreadPoolExecutor, 'submit', counted), \
+                mock.patch(
+                    'posts.management.commands.warm_thumbnails.generate_post',
+                    generated.append):
+            call_command('warm_thumbnails', workers=1, stdout=StringIO())
+        self.assertEqual(len(generated), 21)
+        self.assertLessEqual(max(submitted), PENDING_PER_WORKER)
+
+    def test_schedule_after_commit(self):
+        """Создание поста с картинкой запускает генерацию в пуле."""
+        client = Client()
+        client.force_login(self.user)
+        client.post(reverse('posts:post_create'), {
+            'text': 'С картинкой',
+            'image': SimpleUploadedFile(
+                'other.gif', SMALL_GIF, content_type='image/gif'),
+        })
+        thumbnails.executor().shutdown(wait=True)
+        thumbnails._executor = None
+        self.assertEqual(len(self.thumbnail_files()), VARIANTS)
+
+    def test_backfill_dimensions(self):
+        """У старых постов без размеров они дописываются из заголовка."""
+        Post.objects.filter(pk=self.post.pk).update(
+            image_width=None, image_height=None, image_size=None)
+        thumbnails.generate_post(self.post.pk)
+        self.assertEqual(
+            Post.objects.values_list(
+                'image_width', 'image_height', 'image_size').get(),
+            (2, 1, len(SMALL_GIF)),
+        )
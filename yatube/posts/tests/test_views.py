@@ -1,12 +1,24 @@
 from django import forms
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client, override_settings
+from django.test import (
+    TestCase, TransactionTestCase, Client, override_settings,
+)
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
-from posts.models import Post, Group, Comment, Follow
+from posts import generation, timeline
+from posts.models import Post, Group, Comment, Follow, TimelineEntry
+from posts.storage import content_name, digest
+from django.core.files.base import ContentFile
 import shutil
 import tempfile
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
 from django.conf import settings
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -40,6 +52,8 @@ class PostsPages(TestCase):
             content=small_gif,
             content_type='image/gif'
         )
+        cls.image_name = content_name(
+            'posts/small.gif', digest(ContentFile(small_gif)))
         Post.objects.create(
             author=cls.user,
             text='Тестовый пост',
@@ -50,7 +64,8 @@ class PostsPages(TestCase):
         cls.authorized_client = Client()
         cls.authorized_client.force_login(cls.user)
 
-
+    def setUp(self):
+        cache.clear()
 
     def test_template_auth(self):
         """URL используют соответствующие шаблоны для авторзиванного."""
@@ -144,7 +159,7 @@ class PostsPages(TestCase):
         self.assertEqual(str(post.author), 'auth')
         self.assertEqual(str(post.text), 'Тестовый пост')
         self.assertEqual(post.group, PostsPages.group)
-        self.assertEqual(str(post.image), 'posts/small.gif')
+        self.assertEqual(str(post.image), PostsPages.image_name)
 
     def test_post_is_not_in_group(self):
         """Созданный пост не относится к группе 1."""
@@ -191,6 +206,7 @@ class PaginatorTest(TestCase):
             )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(PaginatorTest.user)
 
@@ -220,6 +236,55 @@ class PaginatorTest(TestCase):
                 response = self.client.get(reverse_name + '?page=2')
                 self.assertEqual(len(response.context[context]), 4)
 
+    def test_cursor_pages(self):
+        """Курсор ведёт на следующую страницу и обратно."""
+        reverse_names = (
+            reverse('posts:index'),
+            reverse('posts:second', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+        for reverse_name in reverse_names:
+            with self.subTest(reverse_name=reverse_name):
+                first = self.client.get(reverse_name).context['page_obj']
+                self.assertTrue(first.has_next())
+                self.assertFalse(first.has_previous())
+                second = self.client.get(
+                    reverse_name, {'cursor': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second), 4)
+                self.assertFalse(second.has_next())
+                self.assertTrue(set(first).isdisjoint(second))
+                back = self.client.get(
+                    reverse_name, {'cursor': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+                self.assertFalse(back.has_previous())
+
+    def test_cursor_pages_rendered(self):
+        """Кешированный список не отдаёт первую страницу вместо курсорной."""
+        reverse_names = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+        for reverse_name in reverse_names:
+            with self.subTest(reverse_name=reverse_name):
+                first = self.client.get(reverse_name)
+                second = self.client.get(
+                    reverse_name,
+                    {'cursor': first.context['page_obj'].next_cursor},
+                )
+                for post in second.context['page_obj']:
+                    link = 'href="{}"'.format(
+                        reverse('posts:post_detail', args=[post.pk]))
+                    self.assertNotContains(first, link)
+                    self.assertContains(second, link)
+
+    def test_bad_cursor(self):
+        """Битый курсор отдаёт первую страницу."""
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': 'broken'})
+        self.assertEqual(len(response.context['page_obj']), 10)
+
 
 class CommentsTest(TestCase):
     @classmethod
@@ -252,6 +317,50 @@ class CommentsTest(TestCase):
         self.assertEqual(author, CommentsTest.user)
 
 
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='пост автора')
+        for i in range(25):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader{i}'),
+                text=f'коммент {i}',
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_page_on_detail(self):
+        """На странице поста первые 20 комментариев, старые сверху."""
+        response = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 20)
+        self.assertEqual(comments[0].text, 'коммент 0')
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, 'load-comments')
+
+    def test_load_more_fragment(self):
+        """Фрагмент «ещё» отдаёт остаток одним запросом с авторами."""
+        response = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}))
+        cursor = response.context['comments'].next_cursor
+        url = reverse(
+            'posts:post_comments', kwargs={'post_id': self.post.pk})
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'cursor': cursor})
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            [f'коммент {i}' for i in range(20, 25)],
+        )
+        self.assertNotContains(response, 'load-comments')
+        self.assertContains(response, 'reader24')
+
+
 class FollowTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -309,4 +418,207 @@ class FollowTest(TestCase):
         self.authorized_client.force_login(unfollowed_user)
         response = self.authorized_client.get(reverse('posts:follow_index'))
         second_object = list(response.context['page_obj'])
-        self.assertEqual(second_object, [])
\ No newline at end of file
+        self.assertEqual(second_object, [])
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(TimelineTest.follower)
+
+    def feed(self, **params):
+        response = self.authorized_client.get(
+            reverse('posts:follow_index'), params)
+        return response.context['page_obj']
+
+    def test_fan_out_on_create(self):
+        """Новый пост раскладывается в ленту подписчика."""
+        post = Post.objects.create(author=TimelineTest.author, text='новый')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TimelineTest.follower, post=post).exists())
+        self.assertEqual(list(self.feed()), [post])
+
+    def test_unfollow_clears_timeline(self):
+        """После отписки посты автора уходят из ленты."""
+        Post.objects.create(author=TimelineTest.author, text='пост')
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'author'}))
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(list(self.feed()), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_merged_on_read(self):
+        """Посты популярного автора не раскладываются, а сливаются."""
+        posts = [
+            Post.objects.create(author=TimelineTest.author, text=str(i))
+            for i in range(12)
+        ]
+        self.assertFalse(TimelineEntry.objects.exists())
+        first = self.feed()
+        self.assertEqual(list(first), posts[:-11:-1])
+        second = self.feed(cursor=first.next_cursor)
+        self.assertEqual(list(second), posts[1::-1])
+        self.assertEqual(
+            list(self.feed(cursor=second.previous_cursor)), list(first))
+
+    def test_rebuild_timelines(self):
+        """Команда пересобирает ленты из подписок."""
+        post = Post.objects.create(author=TimelineTest.author, text='пост')
+        other = User.objects.create_user(username='other')
+        TimelineEntry.objects.all().delete()
+        TimelineEntry.objects.create(
+            user=other, post=post, author=TimelineTest.author,
+            created=post.created)
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user', 'post', 'author')),
+            [(TimelineTest.follower.pk, post.pk, TimelineTest.author.pk)],
+        )
+        self.assertEqual(list(self.feed()), [post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_demoted_author_backfilled(self):
+        """Посты, вышедшие при популярности автора, не пропадают."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=TimelineTest.author)
+        timeline.forget_popular_authors()
+        post = Post.objects.create(author=TimelineTest.author, text='пост')
+        self.assertFalse(TimelineEntry.objects.exists())
+        Follow.objects.filter(user=reader).delete()
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user', 'post')),
+            [(TimelineTest.follower.pk, post.pk)],
+        )
+        self.assertEqual(list(self.feed()), [post])
+
+
+class IndexCacheTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        for i in range(11):
+            Post.objects.create(author=self.user, text=f'пост номер {i}')
+
+    def test_pages_cached_separately(self):
+        """Вторая страница не отдаёт закешированную первую."""
+        first = self.client.get(reverse('posts:index')).content.decode()
+        second = self.client.get(
+            reverse('posts:index'), {'page': 2}).content.decode()
+        self.assertIn('пост номер 10', first)
+        self.assertNotIn('пост номер 0', first)
+        self.assertIn('пост номер 0', second)
+        self.assertNotIn('пост номер 10', second)
+
+    def test_new_post_visible_immediately(self):
+        """Новый пост сбрасывает кеш главной."""
+        self.client.get(reverse('posts:index'))
+        Post.objects.create(author=self.user, text='свежий пост')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'свежий пост')
+
+    def test_cached_fragment_skips_page_query(self):
+        """Если список постов взят из кеша, сами посты не выбираются."""
+        self.client.get(reverse('posts:index'))
+        client = Client()
+        client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse('posts:index'))
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'FROM "posts_post"' in query['sql']
+        ])
+
+    def test_generation_bumped_after_commit(self):
+        """Поколение меняется только после коммита записи."""
+        before = generation.get()
+        with transaction.atomic():
+            Post.objects.create(author=self.user, text='свежий пост')
+            self.assertEqual(generation.get(), before)
+        self.assertGreater(generation.get(), before)
+
+    def test_author_rename_visible(self):
+        """Переименование автора сбрасывает кеш главной."""
+        self.client.get(reverse('posts:index'))
+        self.user.first_name = 'Лев'
+        self.user.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Лев')
+
+
+class AnonymousPageCacheTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=self.user, text='пост')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_not_modified(self):
+        """Повторный запрос гостя с ETag получает 304."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:post_detail', kwargs={
+                'post_id': self.post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                again = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(again.status_code, 304)
+
+    def test_cached_until_write(self):
+        """Гость получает страницу из кеша, пока нет новых записей."""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('posts:index'))
+        self.assertIsNone(response.context)
+        Post.objects.create(author=self.user, text='новый')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'новый')
+
+    def test_follow_counts_fresh(self):
+        """Подписка меняет ETag и счётчики на профиле."""
+        follower = User.objects.create_user(username='follower')
+        url = reverse('posts:profile', kwargs={'username': 'auth'})
+        response = self.client.get(url)
+        self.assertContains(response, 'Подписчиков: 0')
+        Follow.objects.create(
+            user=follower, author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Подписчиков: 1')
+
+    def test_last_modified_after_second(self):
+        """Две записи в одну секунду не получают общий Last-Modified."""
+        clock = mock.Mock()
+        url = reverse('posts:index')
+        with mock.patch('posts.generation.time', clock), \
+                mock.patch('posts.decorators.time', clock):
+            clock.time.return_value = 100.2
+            Post.objects.create(author=self.user, text='первый')
+            self.assertNotIn('Last-Modified', self.client.get(url))
+            clock.time.return_value = 101.5
+            response = self.client.get(url)
+            self.assertEqual(response['Last-Modified'], http_date(101))
+            Post.objects.create(author=self.user, text='второй')
+            clock.time.return_value = 102.5
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertContains(response, 'второй')
+
+    def test_authorized_bypass(self):
+        """Авторизованный пользователь кеш не использует."""
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotIn('ETag', response)
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertIsNotNone(response.context)
@@ -0,0 +1,65 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, transaction
+from PIL import Image
+
+from core import resizer
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails')
+    return _executor
+
+
+def generate(image, intrinsic_width=None):
+    """
+    Все варианты из srcset у {% responsive_image %}: подписанные
+    параметры совпадают, и /img/ отдаёт готовый файл из кеша.
+    """
+    for width, image_format in resizer.variants(intrinsic_width):
+        resizer.ensure(
+            resizer.token(image.name, str(width), image_format=image_format),
+            block=True)
+
+
+def store_dimensions(post):
+    """Размеры для картинок, загруженных до их учёта: читается заголовок."""
+    with post.image.open() as file, Image.open(file) as image:
+        width, height = image.size
+    post.image_width, post.image_height = width, height
+    Post.objects.filter(pk=post.pk).update(
+        image_width=width, image_height=height, image_size=post.image.size)
+
+
+def generate_post(post_id):
+    """Задача для пула: миниатюры одного поста."""
+    try:
+        post = Post.objects.only('image', 'image_width').get(pk=post_id)
+        if post.image:
+            if post.image_width is None:
+                store_dimensions(post)
+            generate(post.image, post.image_width)
+    except Post.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception('Не удалось сделать миниатюры поста %s', post_id)
+    finally:
+        connections.close_all()
+
+
+def schedule(post):
+    """После коммита отдаёт пост пулу, не задерживая ответ."""
+    if post.image:
+        transaction.on_commit(
+            partial(executor().submit, generate_post, post.pk))
@@ -0,0 +1,168 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from core.paginator import PREVIOUS, CursorPaginator
+from .models import Follow, Post, TimelineEntry, UserStats
+
+POPULAR_TIMEOUT = 60 * 5
+
+
+def _popular_key():
+    return f'timeline:popular:{settings.TIMELINE_FANOUT_LIMIT}'
+
+
+def popular_authors():
+    """
+    Авторы, у которых подписчиков больше TIMELINE_FANOUT_LIMIT: их посты
+    не раскладываются по лентам, а подмешиваются при чтении.
+    """
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    key = _popular_key()
+    authors = cache.get(key)
+    if authors is None:
+        authors = set(
+            UserStats.objects.filter(
+                followers_count__gt=limit).values_list('user_id', flat=True)
+        )
+        cache.set(key, authors, POPULAR_TIMEOUT)
+    return authors
+
+
+def forget_popular_authors():
+    """Сбрасывает кеш популярных авторов после массового пересчёта."""
+    cache.delete(_popular_key())
+
+
+def fill(author_id, user_ids=None, limit=None):
+    """
+    Раскладывает посты автора по лентам подписчиков одним INSERT …
+    SELECT; уже разложенные пропускаются. user_ids сужает подписчиков,
+    limit — число последних постов. Возвращает число новых записей.
+    """
+    if user_ids is not None and not user_ids:
+        return 0
+    ops = connection.ops
+    post = Post._meta.db_table
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{TimelineEntry._meta.db_table} '
+        '(user_id, post_id, author_id, created) '
+        'SELECT f.user_id, p.id, p.author_id, p.created '
+        f'FROM {Follow._meta.db_table} f '
+        f'INNER JOIN {post} p ON p.author_id = f.author_id '
+        'WHERE f.author_id = %s'
+    )
+    params = [author_id]
+    if user_ids is not None:
+        placeholders = ', '.join(['%s'] * len(user_ids))
+        sql += f' AND f.user_id IN ({placeholders})'
+        params += list(user_ids)
+    if limit:
+        sql += (
+            f' AND p.id IN (SELECT id FROM {post} WHERE author_id = %s '
+            'ORDER BY created DESC LIMIT %s)'
+        )
+        params += [author_id, limit]
+    sql += ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if post.author_id in popular_authors():
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                created=post.created,
+            )
+            for user_id in followers.iterator()
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def add_author(user_id, author_id):
+    """Заполняет ленту постами автора, на которого только что подписались."""
+    if author_id in popular_authors():
+        return
+    fill(author_id, user_ids=[user_id])
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    if (
+        author_id in popular_authors()
+        and Follow.objects.filter(author_id=author_id).count()
+        <= settings.TIMELINE_FANOUT_LIMIT
+    ):
+        demote(author_id)
+
+
+def demote(author_id):
+    """
+    Автор перестал быть популярным: его посты больше не подмешиваются
+    при чтении, поэтому последние TIMELINE_BACKFILL_POSTS раскладываются
+    по лентам. Кеш популярных сбрасывается после коммита, чтобы его не
+    пересчитали по ещё старым счётчикам.
+    """
+    fill(author_id, limit=settings.TIMELINE_BACKFILL_POSTS)
+    transaction.on_commit(forget_popular_authors)
+
+
+class TimelinePaginator(CursorPaginator):
+    """
+    Курсорная лента подписок: диапазон по индексу ленты пользователя
+    плюс посты популярных авторов, слитые при чтении. Номерные
+    страницы по-прежнему считаются через JOIN с Follow.
+    """
+
+    def __init__(self, user, per_page, **kwargs):
+        posts = Post.objects.filter(
+            author__following__user=user).select_related('author', 'group')
+        super().__init__(posts, per_page, **kwargs)
+        self.user = user
+
+    def fetch(self, pks):
+        """Посты страницы по id; API подменяет их строками values()."""
+        return self.object_list.model.objects.select_related(
+            'author', 'group').in_bulk(pks)
+
+    def _keys(self, queryset, fields, values, reverse):
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse, fields))
+        return list(
+            queryset.order_by(*self._order_by(reverse, fields))
+            .values_list(*fields)[:self.per_page + 1]
+        )
+
+    def _cursor_items(self, direction, values):
+        reverse = direction == PREVIOUS
+        keys = set(self._keys(
+            TimelineEntry.objects.filter(user=self.user),
+            ('created', 'post'), values, reverse,
+        ))
+        popular = popular_authors()
+        if popular:
+            authors = Follow.objects.filter(
+                user=self.user, author__in=popular).values('author')
+            keys.update(self._keys(
+                Post.objects.filter(author__in=authors),
+                ('created', 'pk'), values, reverse,
+            ))
+        keys = sorted(keys, reverse=not reverse)
+        has_more = len(keys) > self.per_page
+        keys = keys[:self.per_page]
+        posts = self.fetch([pk for _, pk in keys])
+        items = [posts[pk] for _, pk in keys if pk in posts]
+        if reverse:
+            items.reverse()
+            return items, True, has_more
+        return items, has_more, values is not None
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -10,12 +10,28 @@ urlpatterns = [
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments',
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name="add_comment",
     ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('export/<str:kind>/', views.export, name='export'),
+    path('api/posts/', api.posts, name='api_posts'),
+    path(
+        'api/posts/<int:post_id>/comments/',
+        api.comments,
+        name='api_comments',
+    ),
+    path('api/groups/', api.groups, name='api_groups'),
+    path('api/profiles/<str:username>/', api.profile, name='api_profile'),
+    path('api/follow/', api.follow, name='api_follow'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
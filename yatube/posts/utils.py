@@ -0,0 +1,29 @@
+from core.paginator import CursorPaginator
+
+len_posts: int = 10
+len_comments: int = 20
+
+
+def get_page_obj(request, queryset, per_page=len_posts):
+    return select_page(request, CursorPaginator(queryset, per_page))
+
+
+def select_page(request, paginator):
+    """
+    По умолчанию курсорная страница (?cursor=), а номер страницы
+    (?page=) остаётся запасным вариантом.
+    """
+    page_number = request.GET.get('page')
+    if page_number is not None:
+        return paginator.get_page(page_number)
+    return paginator.get_cursor_page(request.GET.get('cursor'))
+
+
+def get_comments_page(request, post):
+    """Комментарии по возрастанию времени с авторами одним запросом."""
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        len_comments,
+        ordering=('created', 'pk'),
+    )
+    return paginator.get_cursor_page(request.GET.get('cursor'))
@@ -1,35 +1,51 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from .models import Post, Group, Follow, User
-from django.core.paginator import Paginator
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.conf import settings
+from core.db import serialized_write
+from core.paginator import CursorPage
+from . import generation, thumbnails
+from .counters import user_stats
+from .decorators import anonymous_page_cache, shared_shell_cache
+from .export import parse_moment, stream
 from .forms import PostForm, CommentForm
+from .search import SearchPaginator
+from .timeline import TimelinePaginator
+from .utils import get_comments_page, get_page_obj, len_posts, select_page
 from django.contrib.auth import get_user_model
 
 User =  get_user_model()
 
-len_posts: int = 10
 max_words_title: int = 30
+EXPORT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
 
 
+@anonymous_page_cache
+@shared_shell_cache
 def index(request):
     template = 'posts/index.html'
     posts_list = Post.objects.select_related('author', 'group')
-    paginator = Paginator(posts_list, len_posts)
-    page_namber = request.GET.get('page')
-    page_ogj = paginator.get_page(page_namber)
+    page_obj = get_page_obj(request, posts_list)
     context = {
-        'page_obj': page_ogj,
+        'page_obj': page_obj,
         'posts_list': posts_list,
+        'generation': generation.get(),
+        'cache_timeout': settings.PAGE_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@anonymous_page_cache
+@shared_shell_cache
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     posts = group.groups.select_related('author')
-    paginator = Paginator(posts, len_posts)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_page_obj(request, posts)
     template = 'posts/group_list.html'
     context = {
         'group': group,
@@ -39,33 +55,37 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@anonymous_page_cache
+@shared_shell_cache
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posti = author.posts.all()
-    count = author.posts.count()
-    paginator = Paginator(posti, len_posts)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user,
-        author=author)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    posti = author.posts.select_related('author', 'group')
+    stats = user_stats(author)
+    count = stats.posts_count
+    page_obj = get_page_obj(request, posti)
     context = {
         'page_obj': page_obj,
         'count': count,
+        'stats': stats,
         'author': author,
-        'following': following,
+        'generation': generation.get(),
+        'cache_timeout': settings.PAGE_CACHE_TIMEOUT,
     }
     template = 'posts/profile.html'
     return render(request, template, context)
 
 
+@anonymous_page_cache
+@shared_shell_cache
 def post_detail(request, post_id): 
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id)
     post_title = post.text[:max_words_title] 
     author = post.author 
-    author_posts = author.posts.all().count()
+    author_posts = user_stats(author).posts_count
     form = CommentForm()
-    comments = post.comments.all()
+    comments = get_comments_page(request, post)
     context = { 
         'post': post, 
         'post_title': post_title, 
@@ -78,6 +98,70 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+@anonymous_page_cache
+def post_comments(request, post_id):
+    post = get_object_or_404(Post, pk=post_id)
+    context = {
+        'post': post,
+        'comments': get_comments_page(request, post),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    slug = request.GET.get('group', '')
+    username = request.GET.get('author', '').strip()
+    group = Group.objects.filter(slug=slug).first() if slug else None
+    author = (
+        User.objects.filter(username=username).first() if username else None)
+    page_obj = None
+    if query:
+        paginator = SearchPaginator(
+            query, len_posts, group=group, author=author)
+        if (slug and group is None) or (username and author is None):
+            # Неизвестный фильтр не должен расширять поиск до всех постов.
+            page_obj = CursorPage([], paginator, False, False)
+        else:
+            page_obj = paginator.get_cursor_page(request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'group': group,
+        'author': author,
+        'username': username,
+        'groups': Group.objects.all(),
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@staff_member_required
+def export(request, kind):
+    output_format = request.GET.get('format', 'jsonl')
+    compress = 'gzip' in request.GET
+    try:
+        after = request.GET.get('after')
+        chunks = stream(
+            kind,
+            output_format=output_format,
+            compress=compress,
+            since=parse_moment(request.GET.get('since')),
+            until=parse_moment(request.GET.get('until')),
+            group=request.GET.get('group') or None,
+            after=int(after) if after else None,
+        )
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    filename = f'{kind}.{output_format}'
+    content_type = EXPORT_TYPES[output_format]
+    if compress:
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
 def post_create(request):
     if request.method == 'POST':
@@ -85,11 +169,12 @@ def post_create(request):
         files=request.FILES or None,
         )
         if form.is_valid():
-            post = form.save(commit=False)
-            post.author = request.user
-            post.save()
+            form.instance.author = request.user
+            post = serialized_write(form.save)()
+            thumbnails.schedule(post)
             return redirect(f'/profile/{post.author}/', {'form': form})
-    form = PostForm()
+    else:
+        form = PostForm()
     groups = Group.objects.all()
     template = 'posts/create_post.html'
     context = {
@@ -101,7 +186,8 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     is_edit = True
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author'), pk=post_id)
     author = post.author
     groups = Group.objects.all()
     form = PostForm(
@@ -110,8 +196,10 @@ def post_edit(request, post_id):
         instance=post)
     template = 'posts/create_post.html'
     if request.user == author:
-        if request.method == 'POST' and form.is_valid:
-            post = form.save()
+        if request.method == 'POST' and form.is_valid():
+            post = serialized_write(form.save)()
+            if 'image' in form.changed_data:
+                thumbnails.schedule(post)
             return redirect('posts:post_detail', post_id)
         context = {
             'form': form,
@@ -127,21 +215,22 @@ def post_edit(request, post_id):
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
     if form.is_valid():
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = Post.objects.get(id=post_id)
-        comment.save()
+        form.instance.author = request.user
+        form.instance.post = Post.objects.get(id=post_id)
+        serialized_write(form.save)()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts_list, len_posts)
-    page_namber = request.GET.get('page')
-    page_obj = paginator.get_page(page_namber)
+    page_obj = select_page(
+        request, TimelinePaginator(request.user, len_posts))
     context = {
         'page_obj': page_obj,
+        'generation': generation.get(),
+        'feed_generation': generation.get(
+            generation.feed(request.user.pk)),
+        'cache_timeout': settings.PAGE_CACHE_TIMEOUT,
     }
     return render(request, 'posts/follow.html', context)
 
@@ -150,12 +239,14 @@ def follow_index(request):
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        serialized_write(Follow.objects.get_or_create)(
+            user=request.user, author=author)
     return redirect('posts:profile', username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    serialized_write(
+        Follow.objects.filter(user=request.user, author=author).delete)()
     return redirect('posts:profile', username)
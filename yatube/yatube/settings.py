@@ -52,11 +52,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -92,9 +95,36 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get(
+            'DB_REPLICA_NAME', os.path.join(BASE_DIR, 'db.replica.sqlite3')),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+# Чтение списков с реплик (core.routers.ReplicaRouter). Реплики
+# обновляются командой sync_replica; чтение с них включается DB_REPLICA_READS.
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICA_READS = bool(os.environ.get('DB_REPLICA_READS'))
+REPLICA_APPS = {'posts'}
+REPLICA_VIEWS = {
+    'posts:index',
+    'posts:second',
+    'posts:profile',
+    'posts:follow_index',
+    'posts:post_detail',
+}
+# Отставание реплики, с которым она ещё читается после записи; страницы,
+# построенные по ней, не кешируются (core.routers.readable_replicas).
+REPLICA_MAX_LAG = 5
+REPLICA_PIN_COOKIE = 'db_primary'
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -145,8 +175,135 @@ LOGIN_REDIRECT_URL = 'posts:first'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Общий для всех воркеров кеш в файле SQLite (core.cache.SQLiteCache):
+# инвалидация из одного процесса видна остальным.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+            'CULL_FREQUENCY': 4,
+        },
     }
 }
+
+# Тесты работают с кешем во временном файле, а не с общим (core.testing).
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# Авторы с большим числом подписчиков не раскладываются по лентам
+# при публикации, их посты подмешиваются в ленту при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+# Сколько последних постов раскладывается по лентам, когда автор
+# перестаёт быть популярным (posts.timeline.demote).
+TIMELINE_BACKFILL_POSTS = 1000
+
+# Фрагменты лент сбрасываются сменой поколения (posts.generation),
+# поэтому их можно хранить долго.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Фрагменты отдельных постов (posts.fragments): ключ меняется вместе
+# с содержимым, так что срок нужен только для вытеснения старых ключей.
+POST_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+# Страницы для гостей (posts.decorators.anonymous_page_cache).
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Общие оболочки страниц для авторизованных
+# (posts.decorators.shared_shell_cache).
+SHELL_CACHE_TIMEOUT = 60 * 60
+
+# Защита от лавины пересчётов (core.stampede): блокировка на пересчёт,
+# сколько ждать чужого пересчёта, сколько отдавать устаревшее значение
+# после срока и насколько рано обновлять заранее (beta в XFetch).
+STAMPEDE_LOCK_TIMEOUT = 30
+STAMPEDE_WAIT = 2.0
+STAMPEDE_GRACE = 60 * 5
+STAMPEDE_BETA = 1.0
+
+# Нормализация загруженных картинок (posts.images): длинная сторона,
+# качество, формат хранения (None — исходный, или 'WEBP') и пределы,
+# после которых картинка отклоняется без декодирования.
+IMAGE_MAX_SIDE = 2048
+IMAGE_QUALITY = 85
+IMAGE_FORMAT = None
+IMAGE_MAX_PIXELS = 40_000_000
+IMAGE_MAX_UPLOAD_SIZE = 25 * 1024 * 1024
+
+# Картинки по запросу (/img/, core.resizer): кеш внутри MEDIA_ROOT,
+# процессы пула, предел очереди (сверх него 503), ожидание результата
+# и срок кеширования у клиента.
+IMAGE_CACHE_DIR = os.path.join('cache', 'resized')
+IMAGE_RESIZE_WORKERS = 2
+IMAGE_RESIZE_QUEUE = 32
+IMAGE_RESIZE_TIMEOUT = 10
+IMAGE_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Варианты для srcset ({% responsive_image %}): ширины и форматы,
+# None — исходный формат картинки.
+IMAGE_VARIANT_WIDTHS = (260, 520, 800, 1200)
+IMAGE_VARIANT_FORMATS = ('webp', None)
+
+# Потоки для фоновой генерации миниатюр (posts.thumbnails).
+THUMBNAIL_WORKERS = 2
+
+# Бюджет SQL-запросов на страницу по имени URL (core.middleware).
+# Учитываются и запросы сессии и пользователя, а у записей — SAVEPOINT и
+# RELEASE, которые добавляет транзакция теста. Бюджет записи рассчитан
+# на худший обычный случай: загрузку картинки, её замену, первую
+# подписку без строк счётчиков. При QUERY_BUDGET_ENFORCE превышение —
+# ошибка (включается в тестах через core.testing.TestRunner), иначе
+# запись в лог, как и запрос, повторённый QUERY_BUDGET_REPEATS раз.
+QUERY_BUDGETS = {
+    'image': 0,
+    'posts:index': 4,
+    'posts:second': 5,
+    'posts:profile': 6,
+    'posts:post_detail': 5,
+    'posts:post_comments': 4,
+    'posts:post_create': 16,
+    'posts:post_edit': 14,
+    'posts:add_comment': 12,
+    'posts:follow_index': 6,
+    'posts:search': 8,
+    'posts:export': 4,
+    'posts:api_posts': 3,
+    'posts:api_comments': 4,
+    'posts:api_groups': 3,
+    'posts:api_profile': 3,
+    'posts:api_follow': 5,
+    'posts:profile_follow': 22,
+    'posts:profile_unfollow': 16,
+    'admin:posts_post_add': 21,
+}
+QUERY_BUDGET_DEFAULT = 20
+QUERY_BUDGET_REPEATS = 5
+QUERY_BUDGET_ENFORCE = False
+
+# Профилирование отдельных запросов (core.middleware.ProfilingMiddleware):
+# флаг ?profile для staff или заголовок X-Profile из
+# core.profiling.make_token(), который действует PROFILING_MAX_AGE секунд.
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILING_PARAM = 'profile'
+PROFILING_MAX_AGE = 60 * 10
+
+# Настройки каждого соединения SQLite (core.db.apply_pragmas): WAL,
+# чтобы чтение не блокировалось записью, ожидание блокировки вместо
+# ошибки и кеш страниц с mmap.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Повторы записи при «database is locked» (core.db.serialized_write).
+DB_WRITE_RETRIES = 3
+DB_WRITE_RETRY_DELAY = 0.05
+
+# Номерные страницы (?page=) считают записи не дальше этого числа
+# (core.paginator.CursorPaginator.count); дальше листают курсором.
+PAGINATOR_MAX_COUNT = 1000
@@ -18,11 +18,15 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core import views as core_views
+
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('about/', include('about.urls', namespace='about')),
     path('admin/', admin.site.urls),
+    path('profiling/', include('core.urls', namespace='core')),
+    path('img/<str:token>/', core_views.image, name='image'),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
 ]